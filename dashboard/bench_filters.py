@@ -0,0 +1,73 @@
+"""Compare indexed dashboard filtering with the original per-row .dt.date masks.
+
+Usage: python bench_filters.py --rows 1000000 10000000
+
+Builds a snapshot-shaped frame, checks both versions select the same rows and
+reports the index build time and the latency of each filter combination.
+"""
+import time
+import argparse
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from transaction_index import TransactionIndex
+from t3_shared.transaction_schema import cast_transactions
+
+FIRST_DAY = date(2024, 1, 1)
+DAYS = 365
+FILTERS = {
+    "one week": (FIRST_DAY + timedelta(days=100), FIRST_DAY + timedelta(days=106), [], None),
+    "week, 2 trucks": (FIRST_DAY + timedelta(days=100), FIRST_DAY + timedelta(days=106), [2, 5], None),
+    "year, card": (FIRST_DAY, FIRST_DAY + timedelta(days=DAYS - 1), [], 1),
+    "quarter, truck, cash": (FIRST_DAY + timedelta(days=90), FIRST_DAY + timedelta(days=180), [3], 2)
+}
+
+
+def legacy_apply_filters(df, start_date, end_date, truck_filter, payment_method_id):
+    """The apply_filters implementation this benchmark is measured against."""
+    filtered_data = df[(df['timestamp'].dt.date >= start_date)
+                       & (df['timestamp'].dt.date <= end_date)]
+    if truck_filter:
+        filtered_data = filtered_data[filtered_data['truck_id'].isin(truck_filter)]
+    if payment_method_id is not None:
+        filtered_data = filtered_data[filtered_data['payment_method_id'] == payment_method_id]
+    return filtered_data
+
+
+def make_transactions(rows: int) -> pd.DataFrame:
+    """Build a year of transactions across six trucks, in arrival order."""
+    rng = np.random.default_rng(7)
+    return cast_transactions(pd.DataFrame({
+        "truck_id": rng.integers(1, 7, rows),
+        "payment_method_id": rng.integers(1, 3, rows),
+        "total": rng.integers(100, 10000, rows),
+        "timestamp": np.sort(np.datetime64(FIRST_DAY) + rng.integers(
+            0, DAYS * 24 * 3600, rows).astype("timedelta64[s]"))
+    }))
+
+
+def time_call(func, *args) -> tuple[object, float]:
+    """Call func and return its result and elapsed time."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dashboard filtering.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        df = make_transactions(rows)
+        index, build_time = time_call(TransactionIndex, df)
+        print(f"{rows:>11,} rows  index build {build_time * 1000:>8.1f} ms")
+
+        for name, (start_date, end_date, trucks, payment_id) in FILTERS.items():
+            expected, legacy_time = time_call(
+                legacy_apply_filters, df, start_date, end_date, trucks, payment_id)
+            actual, indexed_time = time_call(
+                index.filter, start_date, end_date, trucks, payment_id)
+            assert expected.reset_index(drop=True).equals(actual.reset_index(drop=True)), name
+            print(f"{'':>13}{name:<22} {len(actual):>10,} rows  .dt.date {legacy_time * 1000:>8.1f} ms"
+                  f"  indexed {indexed_time * 1000:>7.1f} ms")
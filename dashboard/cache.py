@@ -0,0 +1,63 @@
+"""In-process cache for the dashboard's query results.
+
+Entries are keyed by query name and parameters, expire after a TTL and are
+evicted least-recently-used once the cache is full. Hit/miss counts and the
+latest fetch latency per query are kept for the debug panel.
+"""
+import time
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+
+
+class QueryCache:
+    """A thread-safe TTL cache with LRU eviction and hit/miss counters."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.fetch_seconds = {}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_fetch(self, name: str, params: Hashable, fetch: Callable):
+        """Return the cached result for (name, params), calling fetch on a miss or expiry."""
+        key = (name, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        start = time.perf_counter()
+        value = fetch()
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.misses += 1
+            self.fetch_seconds[name] = elapsed
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        """Drop every cached entry, keeping the counters."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Counters and latencies for the debug panel."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "fetch_seconds": dict(self.fetch_seconds)
+            }
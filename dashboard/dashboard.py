@@ -3,13 +3,26 @@ import os
 import pandas as pd
 import streamlit as st
 import altair as alt
-import redshift_connector
 import logging
 from dotenv import load_dotenv
+from queries import (build_filter_clause, get_filter_bounds, get_watermark,
+                     CHART_QUERIES, PAYMENT_METHOD_IDS)
+from cache import QueryCache
+from t3_shared.connection import ConnectionPool
+from snapshot import refresh_snapshot, SNAPSHOT_DIR
+from transaction_index import TransactionIndex
 
 
 COLOUR_CARD = "#1f77b4"
 COLOUR_CASH = "#B3E5FC"
+PENCE_PER_POUND = 100
+PAYMENT_METHOD_NAMES = {payment_id: name for name, payment_id in PAYMENT_METHOD_IDS.items()}
+# "aggregate" pushes filters and groupings down to Redshift; "snapshot" keeps a
+# local Parquet copy of every transaction and aggregates in pandas.
+DATA_SOURCE = os.getenv("DASHBOARD_DATA_SOURCE", "aggregate")
+CACHE_TTL_SECONDS = int(os.getenv("DASHBOARD_CACHE_TTL", "900"))
+CACHE_MAX_ENTRIES = int(os.getenv("DASHBOARD_CACHE_MAX_ENTRIES", "64"))
+WATERMARK_TTL_SECONDS = int(os.getenv("DASHBOARD_WATERMARK_TTL", "60"))
 
 st.markdown(
     """
@@ -35,42 +48,28 @@ st.markdown(
 )
 
 
-def get_redshift_connection():
-    """Establish and return a connection to the Redshift database."""
-    try:
-        conn = redshift_connector.connect(
-            host=os.environ["HOST"],
-            port=int(os.environ.get("PORT", 5439)),
-            user=os.environ["USERNAME"],
-            password=os.environ["PASSWORD"],
-            database=os.environ["DATABASE_NAME"]
-        )
-        conn.autocommit = True
-        logging.info("Connected to Redshift.")
-        return conn
-    except Exception as e:
-        logging.error("Error connecting to Redshift: %s", str(e))
-        raise
-
-
-def load_data_from_redshift():
-    """Loads the data from redshift."""
-    query = """
-    SELECT 
-        truck_id,
-        payment_method_id,
-        total,
-        at AS timestamp
-    FROM 
-        ellie_bradley_schema.FACT_Transaction;
-    """
-    try:
-        conn = get_redshift_connection()
-        df = pd.read_sql(query, conn)
-    finally:
-        conn.close()
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    return df
+@st.cache_resource
+def get_connection_pool():
+    """Process-wide pool of Redshift connections, reused across reruns and sessions."""
+    return ConnectionPool()
+
+
+@st.cache_resource
+def get_query_cache():
+    """Process-wide cache of query results, shared by every session."""
+    return QueryCache(CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES)
+
+
+@st.cache_resource
+def get_watermark_cache():
+    """Short-lived cache of the latest transaction timestamp."""
+    return QueryCache(WATERMARK_TTL_SECONDS, max_entries=1)
+
+
+@st.cache_resource
+def get_snapshot_cache():
+    """Holds the indexed in-memory copy of the local snapshot for the latest watermark only."""
+    return QueryCache(float("inf"), max_entries=1)
 
 
 def home_page():
@@ -80,63 +79,76 @@ def home_page():
         "### An interactive dashboard to explore T3’s transaction data and monitor truck performance.")
 
 
-def render_sidebar_filters(df):
+def render_sidebar_filters(bounds):
     """Renders the sidebar filters for the data."""
     st.sidebar.header("Filter Options")
-    start_date = st.sidebar.date_input(
-        "Start date", df['timestamp'].min().date())
-    end_date = st.sidebar.date_input("End date", df['timestamp'].max().date())
+    start_date = st.sidebar.date_input("Start date", bounds["min_date"])
+    end_date = st.sidebar.date_input("End date", bounds["max_date"])
     truck_filter = st.sidebar.multiselect(
-        "Select trucks", df['truck_id'].unique())
+        "Select trucks", bounds["truck_ids"])
     payment_filter = st.sidebar.radio(
         "Select payment type", ("All", "Card", "Cash"))
     return start_date, end_date, truck_filter, payment_filter
 
 
-def apply_filters(df, start_date, end_date, truck_filter, payment_filter):
-    """Apply filters to graphs."""
-    filtered_data = df[(df['timestamp'].dt.date >= start_date)
-                       & (df['timestamp'].dt.date <= end_date)]
-    if truck_filter:
-        filtered_data = filtered_data[filtered_data['truck_id'].isin(
-            truck_filter)]
-    if payment_filter != "All":
-        payment_id = 1 if payment_filter == "Card" else 2
-        filtered_data = filtered_data[filtered_data['payment_method_id'] == payment_id]
-    return filtered_data
+def apply_filters(index, start_date, end_date, truck_filter, payment_filter):
+    """Apply filters to graphs using the snapshot's date, truck and payment indexes."""
+    return index.filter(start_date, end_date, truck_filter,
+                        PAYMENT_METHOD_IDS.get(payment_filter))
+
+
+def summarise_transactions(filtered_data):
+    """Aggregate filtered transactions into the same result sets as queries.get_chart_data."""
+    by_truck = filtered_data.groupby('truck_id')['total']
+    truck_summary = pd.DataFrame({
+        'total_revenue': by_truck.sum() / PENCE_PER_POUND,
+        'average_transaction_value': by_truck.mean() / PENCE_PER_POUND,
+        'transaction_count': by_truck.size()
+    }).reset_index()
+
+    day = filtered_data['timestamp'].dt.floor('D').rename('date')
+    daily_revenue = (filtered_data.groupby([day, 'truck_id'])['total'].sum()
+                     / PENCE_PER_POUND).rename('total_revenue').reset_index()
+
+    hour = filtered_data['timestamp'].dt.hour.rename('hour')
+    hourly_volume = filtered_data.groupby(hour).size().reset_index(name='count')
+
+    payment_mix = filtered_data.groupby(
+        'payment_method_id').size().reset_index(name='count')
 
+    return {
+        "truck_summary": truck_summary,
+        "daily_revenue": daily_revenue,
+        "hourly_volume": hourly_volume,
+        "payment_mix": payment_mix
+    }
 
-def plot_total_revenue_by_truck(filtered_data):
+
+def plot_total_revenue_by_truck(truck_summary):
     """A bar chart of the total revenue for each truck."""
     st.subheader("Total Revenue by Truck")
-    revenue_by_truck = filtered_data.groupby(
-        'truck_id')['total'].sum().reset_index()
-    chart = alt.Chart(revenue_by_truck).mark_bar(color=COLOUR_CARD).encode(
+    chart = alt.Chart(truck_summary).mark_bar(color=COLOUR_CARD).encode(
         x=alt.X('truck_id:O', title='Truck ID'),
-        y=alt.Y('total:Q', title='Total Revenue (£)')
+        y=alt.Y('total_revenue:Q', title='Total Revenue (£)')
     )
     st.altair_chart(chart, use_container_width=True)
 
 
-def plot_average_transaction_value(filtered_data):
+def plot_average_transaction_value(truck_summary):
     """A bar chart to show the average transaction value per truck."""
     st.subheader("Average Transaction Value by Truck")
-    avg_transaction = filtered_data.groupby(
-        'truck_id')['total'].mean().reset_index()
-    chart = alt.Chart(avg_transaction).mark_bar(color=COLOUR_CARD).encode(
+    chart = alt.Chart(truck_summary).mark_bar(color=COLOUR_CARD).encode(
         x=alt.X('truck_id:O', title='Truck ID'),
-        y=alt.Y('total:Q', title='Average Transaction Value (£)')
+        y=alt.Y('average_transaction_value:Q',
+                title='Average Transaction Value (£)')
     )
     st.altair_chart(chart, use_container_width=True)
 
 
-def plot_revenue_trends(filtered_data):
+def plot_revenue_trends(daily_revenue):
     """A line graph to show the revenue trends by date."""
     st.subheader("Revenue Trends by Date")
-    revenue_trends = filtered_data.groupby(
-        [filtered_data['timestamp'].dt.date, 'truck_id'])['total'].sum().reset_index()
-    revenue_trends.columns = ['date', 'truck_id', 'total_revenue']
-    chart = alt.Chart(revenue_trends).mark_line(color=COLOUR_CARD).encode(
+    chart = alt.Chart(daily_revenue).mark_line(color=COLOUR_CARD).encode(
         x=alt.X('date:T', title='Date'),
         y=alt.Y('total_revenue:Q', title='Total Revenue'),
         tooltip=['date:T', 'total_revenue:Q', 'truck_id:N']
@@ -144,27 +156,23 @@ def plot_revenue_trends(filtered_data):
     st.altair_chart(chart, use_container_width=True)
 
 
-def plot_transaction_volume_by_hour(filtered_data):
+def plot_transaction_volume_by_hour(hourly_volume):
     """A bar chart to show the peak transaction times. """
     st.subheader("Peak Transaction Times")
-    filtered_data['hour'] = filtered_data['timestamp'].dt.hour
-    transactions_by_hour = filtered_data.groupby(
-        'hour').size().reset_index(name='count')
-    chart = alt.Chart(transactions_by_hour).mark_line(color=COLOUR_CARD).encode(
+    chart = alt.Chart(hourly_volume).mark_line(color=COLOUR_CARD).encode(
         x=alt.X('hour:O', title='Hour of Day'),
         y=alt.Y('count:Q', title='Transaction Volume')
     )
     st.altair_chart(chart, use_container_width=True)
 
 
-def plot_payment_method_distribution(filtered_data):
+def plot_payment_method_distribution(payment_mix):
     """Create a pie chart of cash vs card payment options."""
     st.subheader("Payment Method Distribution")
-    payment_dist = filtered_data['payment_method_id'].value_counts(
-        normalize=True).reset_index()
-    payment_dist.columns = ['payment_method', 'proportion']
-    payment_dist['payment_method'] = payment_dist['payment_method'].replace({
-                                                                            1: 'Card', 2: 'Cash'})
+    payment_dist = pd.DataFrame({
+        'payment_method': payment_mix['payment_method_id'].map(PAYMENT_METHOD_NAMES),
+        'proportion': payment_mix['count'] / payment_mix['count'].sum()
+    })
 
     pie_chart = alt.Chart(payment_dist).mark_arc(innerRadius=50).encode(
         theta=alt.Theta('proportion:Q', title=""),
@@ -175,14 +183,13 @@ def plot_payment_method_distribution(filtered_data):
     st.altair_chart(pie_chart, use_container_width=True)
 
 
-def plot_card_cash_count(filtered_data):
+def plot_card_cash_count(payment_mix):
     """Create a bar chart of cash vs card payment options."""
     st.subheader("Count of Card vs Cash Transactions")
-    payment_count = filtered_data['payment_method_id'].value_counts(
-    ).reset_index()
-    payment_count.columns = ['payment_method', 'count']
-    payment_count['payment_method'] = payment_count['payment_method'].replace({
-                                                                              1: 'Card', 2: 'Cash'})
+    payment_count = pd.DataFrame({
+        'payment_method': payment_mix['payment_method_id'].map(PAYMENT_METHOD_NAMES),
+        'count': payment_mix['count']
+    })
 
     bar_chart = alt.Chart(payment_count).mark_bar().encode(
         x=alt.X('payment_method:N', title='Payment Method'),
@@ -194,21 +201,81 @@ def plot_card_cash_count(filtered_data):
     st.altair_chart(bar_chart, use_container_width=True)
 
 
+def render_refresh_control():
+    """A sidebar button that drops every cached result."""
+    if st.sidebar.button("Refresh data"):
+        get_query_cache().clear()
+        get_watermark_cache().clear()
+        get_snapshot_cache().clear()
+
+
+def render_cache_debug_panel(watermark):
+    """Show cache hit/miss counts and the latest fetch latency of each query."""
+    stats = get_query_cache().stats()
+    with st.sidebar.expander("Cache debug"):
+        st.write(f"Latest transaction: {watermark}")
+        st.write(f"Hits: {stats['hits']} | Misses: {stats['misses']} | "
+                 f"Hit ratio: {stats['hit_ratio']:.0%}")
+        st.write(f"Cached entries: {stats['entries']} of {CACHE_MAX_ENTRIES}")
+        st.dataframe(pd.DataFrame(stats['fetch_seconds'].items(),
+                                  columns=['Query', 'Last fetch (s)']))
+
+
+def load_chart_data():
+    """Render the sidebar filters and fetch the aggregated data for every chart.
+
+    Results are cached per query, filter values and watermark, so they are only
+    refetched once new transactions land or their TTL expires. A pooled
+    connection is only borrowed when something actually needs fetching.
+    """
+    conn = None
+
+    def connect():
+        nonlocal conn
+        if conn is None:
+            conn = get_connection_pool().acquire()
+        return conn
+
+    cache = get_query_cache()
+    try:
+        watermark = get_watermark_cache().get_or_fetch(
+            "watermark", (), lambda: get_watermark(connect()))
+
+        if DATA_SOURCE == "snapshot":
+            index = get_snapshot_cache().get_or_fetch(
+                "transactions", watermark,
+                lambda: TransactionIndex(refresh_snapshot(connect, SNAPSHOT_DIR)))
+            filters = render_sidebar_filters(index.get_bounds())
+            return summarise_transactions(apply_filters(index, *filters)), watermark
+
+        bounds = cache.get_or_fetch(
+            "filter_bounds", watermark, lambda: get_filter_bounds(connect()))
+        where, params = build_filter_clause(*render_sidebar_filters(bounds))
+        chart_data = {
+            name: cache.get_or_fetch(
+                name, (where, tuple(params), watermark),
+                lambda query=query: query(connect(), where, params))
+            for name, query in CHART_QUERIES.items()
+        }
+        return chart_data, watermark
+    finally:
+        if conn is not None:
+            get_connection_pool().release(conn)
+
+
 def main():
     """Main function for the dashboard."""
-    truck_data = load_data_from_redshift()
     home_page()
-    start_date, end_date, truck_filter, payment_filter = render_sidebar_filters(
-        truck_data)
-    filtered_data = apply_filters(
-        truck_data, start_date, end_date, truck_filter, payment_filter)
-
-    plot_total_revenue_by_truck(filtered_data)
-    plot_average_transaction_value(filtered_data)
-    plot_revenue_trends(filtered_data)
-    plot_transaction_volume_by_hour(filtered_data)
-    plot_payment_method_distribution(filtered_data)
-    plot_card_cash_count(filtered_data)
+    render_refresh_control()
+    chart_data, watermark = load_chart_data()
+
+    plot_total_revenue_by_truck(chart_data["truck_summary"])
+    plot_average_transaction_value(chart_data["truck_summary"])
+    plot_revenue_trends(chart_data["daily_revenue"])
+    plot_transaction_volume_by_hour(chart_data["hourly_volume"])
+    plot_payment_method_distribution(chart_data["payment_mix"])
+    plot_card_cash_count(chart_data["payment_mix"])
+    render_cache_debug_panel(watermark)
 
 
 if __name__ == "__main__":
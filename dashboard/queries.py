@@ -0,0 +1,116 @@
+"""Query layer that pushes the dashboard's filters and aggregations down to Redshift.
+
+Charts read the daily and hourly truck summaries maintained by the ETL, so
+each query scans days x trucks rows rather than every transaction and returns
+only the small result set one chart needs, in pounds.
+"""
+from datetime import date
+import pandas as pd
+
+SCHEMA = "ellie_bradley_schema"
+PAYMENT_METHOD_IDS = {"Card": 1, "Cash": 2}
+
+
+def build_filter_clause(start_date: date, end_date: date, truck_filter: list,
+                        payment_filter: str) -> tuple[str, list]:
+    """Build a WHERE clause over the summary tables from the sidebar filter values."""
+    conditions = ["day >= %s", "day <= %s"]
+    params = [start_date, end_date]
+
+    if truck_filter:
+        conditions.append(
+            f"truck_id IN ({', '.join(['%s'] * len(truck_filter))})")
+        params.extend(int(truck_id) for truck_id in truck_filter)
+
+    if payment_filter != "All":
+        conditions.append("payment_method_id = %s")
+        params.append(PAYMENT_METHOD_IDS[payment_filter])
+
+    return " AND ".join(conditions), params
+
+
+def get_filter_bounds(conn) -> dict:
+    """Retrieve the date range and truck IDs available to the sidebar filters, defaulting to today when empty."""
+    bounds = pd.read_sql(f"""
+        SELECT truck_id, MIN(day) AS first_day, MAX(day) AS last_day
+        FROM {SCHEMA}.AGG_Daily_Truck_Summary
+        GROUP BY truck_id
+        ORDER BY truck_id;
+    """, conn)
+    if bounds.empty:
+        return {"min_date": date.today(), "max_date": date.today(), "truck_ids": []}
+    return {
+        "min_date": pd.Timestamp(bounds["first_day"].min()).date(),
+        "max_date": pd.Timestamp(bounds["last_day"].max()).date(),
+        "truck_ids": bounds["truck_id"].astype(int).tolist()
+    }
+
+
+def get_truck_summary(conn, where: str, params: list) -> pd.DataFrame:
+    """Total revenue, average transaction value and count per truck."""
+    return pd.read_sql(f"""
+        SELECT truck_id,
+               SUM(total_revenue)::FLOAT / 100 AS total_revenue,
+               SUM(total_revenue)::FLOAT / 100 / SUM(transaction_count) AS average_transaction_value,
+               SUM(transaction_count) AS transaction_count
+        FROM {SCHEMA}.AGG_Daily_Truck_Summary
+        WHERE {where}
+        GROUP BY truck_id
+        ORDER BY truck_id;
+    """, conn, params=params)
+
+
+def get_daily_revenue(conn, where: str, params: list) -> pd.DataFrame:
+    """Total revenue per truck per day."""
+    return pd.read_sql(f"""
+        SELECT day AS date, truck_id,
+               SUM(total_revenue)::FLOAT / 100 AS total_revenue
+        FROM {SCHEMA}.AGG_Daily_Truck_Summary
+        WHERE {where}
+        GROUP BY 1, 2
+        ORDER BY 1, 2;
+    """, conn, params=params)
+
+
+def get_hourly_volume(conn, where: str, params: list) -> pd.DataFrame:
+    """Transaction count per hour of the day."""
+    return pd.read_sql(f"""
+        SELECT hour, SUM(transaction_count) AS count
+        FROM {SCHEMA}.AGG_Hourly_Truck_Summary
+        WHERE {where}
+        GROUP BY hour
+        ORDER BY 1;
+    """, conn, params=params)
+
+
+def get_payment_mix(conn, where: str, params: list) -> pd.DataFrame:
+    """Transaction count per payment method."""
+    return pd.read_sql(f"""
+        SELECT payment_method_id, SUM(transaction_count) AS count
+        FROM {SCHEMA}.AGG_Daily_Truck_Summary
+        WHERE {where}
+        GROUP BY payment_method_id
+        ORDER BY payment_method_id;
+    """, conn, params=params)
+
+
+def get_watermark(conn):
+    """Retrieve the timestamp of the most recent transaction."""
+    return pd.read_sql(
+        f"SELECT MAX(at) AS watermark FROM {SCHEMA}.FACT_Transaction;", conn)["watermark"].iloc[0]
+
+
+CHART_QUERIES = {
+    "truck_summary": get_truck_summary,
+    "daily_revenue": get_daily_revenue,
+    "hourly_volume": get_hourly_volume,
+    "payment_mix": get_payment_mix
+}
+
+
+def get_chart_data(conn, start_date: date, end_date: date, truck_filter: list,
+                   payment_filter: str) -> dict[str, pd.DataFrame]:
+    """Run every chart's aggregate query for the current filter values."""
+    where, params = build_filter_clause(
+        start_date, end_date, truck_filter, payment_filter)
+    return {name: query(conn, where, params) for name, query in CHART_QUERIES.items()}
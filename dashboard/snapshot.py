@@ -0,0 +1,146 @@
+"""Local Parquet snapshot of FACT_Transaction, refreshed incrementally.
+
+The snapshot is a directory of Parquet parts, each named after its latest
+timestamp. A refresh re-queries a trailing window of SNAPSHOT_OVERLAP_HOURS
+before the snapshot's high-water mark, which covers the hours the hourly ETL
+reloads. Every row in that window is replaced, so late files, reprocessed
+objects and deleted rows are all reflected. Only the parts overlapping the
+window are rewritten. Parts are compacted into one file once there are more
+than SNAPSHOT_MAX_PARTS. A refresh interrupted between writing the new part and
+removing the parts it replaces can leave duplicate rows; delete the snapshot
+directory to rebuild it.
+"""
+import os
+import glob
+import shutil
+import logging
+from collections.abc import Callable
+from datetime import datetime
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from t3_shared.transaction_schema import cast_transactions
+
+SNAPSHOT_DIR = os.getenv("DASHBOARD_SNAPSHOT_DIR", "data/transactions_snapshot")
+SNAPSHOT_MAX_PARTS = int(os.getenv("DASHBOARD_SNAPSHOT_MAX_PARTS", "24"))
+# At least the hourly ETL's three-hour lookback, plus the hour in progress.
+SNAPSHOT_OVERLAP_HOURS = float(os.getenv("DASHBOARD_SNAPSHOT_OVERLAP_HOURS", "4"))
+READ_CHUNK_SIZE = 100_000
+PART_TIMESTAMP_FORMAT = "%Y%m%dT%H%M%S%f"
+SCHEMA = "ellie_bradley_schema"
+TRANSACTION_COLUMNS = ["truck_id", "payment_method_id", "total", "timestamp"]
+
+
+def list_parts(snapshot_dir: str) -> list[str]:
+    """List the snapshot's Parquet parts."""
+    return glob.glob(os.path.join(snapshot_dir, "*.parquet"))
+
+
+def get_part_high_water(part_path: str) -> pd.Timestamp:
+    """Return the latest timestamp in a part, as encoded in its file name."""
+    name = os.path.basename(part_path)[len("part-"):-len(".parquet")]
+    return pd.Timestamp(datetime.strptime(name, PART_TIMESTAMP_FORMAT))
+
+
+def get_empty_transactions() -> pd.DataFrame:
+    """An empty transaction frame with the snapshot's columns and dtypes."""
+    return cast_transactions(pd.DataFrame(columns=TRANSACTION_COLUMNS))
+
+
+def read_snapshot(snapshot_dir: str) -> pd.DataFrame:
+    """Read every part of the snapshot, or an empty frame if there is none yet."""
+    if not list_parts(snapshot_dir):
+        return get_empty_transactions()
+    return cast_transactions(pq.read_table(snapshot_dir).to_pandas())
+
+
+def read_snapshot_part(part_path: str) -> pd.DataFrame:
+    """Read a single part of the snapshot."""
+    return cast_transactions(pq.read_table(part_path).to_pandas())
+
+
+def fetch_transactions_since(conn, window_start) -> pd.DataFrame:
+    """Fetch transactions at or after window_start (or all of them), casting each chunk on arrival."""
+    query = f"""
+        SELECT truck_id, payment_method_id, total, at AS timestamp
+        FROM {SCHEMA}.FACT_Transaction
+    """
+    params = None
+    if window_start is not None:
+        query += " WHERE at >= %s"
+        params = [window_start]
+
+    chunks = [cast_transactions(chunk) for chunk in pd.read_sql(
+        query, conn, params=params, parse_dates=['timestamp'], chunksize=READ_CHUNK_SIZE)]
+    # An empty FACT_Transaction yields no chunks at all.
+    return pd.concat(chunks, ignore_index=True) if chunks else get_empty_transactions()
+
+
+def write_part(df: pd.DataFrame, snapshot_dir: str) -> str:
+    """Atomically add a Parquet part holding df to the snapshot and return its path."""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    high_water = df['timestamp'].max().strftime(PART_TIMESTAMP_FORMAT)
+    part_path = os.path.join(snapshot_dir, f"part-{high_water}.parquet")
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False),
+                   f"{part_path}.tmp", compression="zstd")
+    os.replace(f"{part_path}.tmp", part_path)
+    return part_path
+
+
+def replace_window(snapshot_dir: str, window_start, window_rows: pd.DataFrame) -> None:
+    """Replace every snapshot row at or after window_start with window_rows.
+
+    Only the parts whose latest timestamp falls in the window are rewritten.
+    Their earlier rows go into a part of their own, so the next refresh, whose
+    window starts later, leaves that part alone.
+    """
+    stale_parts = [part_path for part_path in list_parts(snapshot_dir)
+                   if get_part_high_water(part_path) >= window_start]
+    earlier_rows = [df[df['timestamp'] < window_start] for df in (
+        read_snapshot_part(part_path) for part_path in stale_parts)]
+    earlier_rows = [df for df in earlier_rows if not df.empty]
+
+    written = set()
+    if earlier_rows:
+        written.add(write_part(cast_transactions(pd.concat(earlier_rows, ignore_index=True)),
+                               snapshot_dir))
+    if not window_rows.empty:
+        written.add(write_part(window_rows, snapshot_dir))
+    for part_path in stale_parts:
+        if part_path not in written:
+            os.remove(part_path)
+
+
+def compact_snapshot(df: pd.DataFrame, snapshot_dir: str) -> None:
+    """Replace every part of the snapshot with a single part holding df."""
+    compacted_dir = f"{snapshot_dir}.compacting"
+    shutil.rmtree(compacted_dir, ignore_errors=True)
+    write_part(df, compacted_dir)
+    shutil.rmtree(snapshot_dir)
+    os.replace(compacted_dir, snapshot_dir)
+
+
+def refresh_snapshot(connect: Callable, snapshot_dir: str) -> pd.DataFrame:
+    """Bring the snapshot up to date and return its contents.
+
+    The first refresh fetches every transaction; later ones replace the
+    trailing SNAPSHOT_OVERLAP_HOURS window with what the database now holds.
+    """
+    snapshot = read_snapshot(snapshot_dir)
+    if snapshot.empty:
+        rows = fetch_transactions_since(connect(), None)
+        if not rows.empty:
+            write_part(rows, snapshot_dir)
+            logging.info("Wrote %d transactions to the snapshot.", len(rows))
+        return rows
+
+    window_start = snapshot['timestamp'].max() - pd.Timedelta(hours=SNAPSHOT_OVERLAP_HOURS)
+    window_rows = fetch_transactions_since(connect(), window_start)
+    replace_window(snapshot_dir, window_start, window_rows)
+    logging.info("Refreshed %d transactions since %s in the snapshot.", len(window_rows), window_start)
+    snapshot = cast_transactions(pd.concat(
+        [snapshot[snapshot['timestamp'] < window_start], window_rows], ignore_index=True))
+
+    if len(list_parts(snapshot_dir)) > SNAPSHOT_MAX_PARTS:
+        compact_snapshot(snapshot, snapshot_dir)
+    return snapshot
@@ -0,0 +1,81 @@
+"""Sorted, indexed copy of the snapshot's transactions for fast sidebar filtering.
+
+Rows are kept in timestamp order alongside a day-number column, so a date
+range resolves to a contiguous slice with two binary searches. Each truck and
+payment method keeps a sorted array of its row positions; the selected ones
+are clipped to the slice and combined into a mask, so no filter touches a row
+outside the date range or builds a Python object per row.
+"""
+from datetime import date
+import numpy as np
+import pandas as pd
+
+
+def get_positions_by_value(values: np.ndarray) -> dict[int, np.ndarray]:
+    """Map each distinct value to the sorted row positions holding it."""
+    order = np.argsort(values, kind="stable")
+    distinct, starts = np.unique(values[order], return_index=True)
+    position_dtype = np.int32 if len(values) < np.iinfo(np.int32).max else np.int64
+    return {int(value): np.sort(positions).astype(position_dtype)
+            for value, positions in zip(distinct, np.split(order, starts[1:]))}
+
+
+def to_day_number(day: date) -> int:
+    """Days since the epoch, matching TransactionIndex.day_numbers."""
+    return int(np.datetime64(day, "D").astype(np.int64))
+
+
+class TransactionIndex:
+    """An immutable, timestamp-sorted transaction frame with row indexes per truck and payment method."""
+
+    def __init__(self, df: pd.DataFrame):
+        if not df.empty and not df['timestamp'].is_monotonic_increasing:
+            df = df.sort_values('timestamp', kind="stable")
+        self.frame = df.reset_index(drop=True)
+        self.day_numbers = self.frame['timestamp'].to_numpy().astype("datetime64[D]").astype(np.int64)
+        self.truck_positions = get_positions_by_value(self.frame['truck_id'].to_numpy())
+        self.payment_positions = get_positions_by_value(self.frame['payment_method_id'].to_numpy())
+
+    def get_bounds(self) -> dict:
+        """Date range and truck IDs available to the sidebar filters, defaulting to today when empty."""
+        if self.frame.empty:
+            return {"min_date": date.today(), "max_date": date.today(), "truck_ids": []}
+        return {
+            "min_date": self.frame['timestamp'].iloc[0].date(),
+            "max_date": self.frame['timestamp'].iloc[-1].date(),
+            "truck_ids": sorted(self.truck_positions)
+        }
+
+    def get_mask(self, positions: list[np.ndarray], start: int, stop: int) -> np.ndarray:
+        """Mark the positions falling in rows start:stop, relative to start."""
+        mask = np.zeros(stop - start, dtype=bool)
+        for value_positions in positions:
+            clipped = value_positions[np.searchsorted(value_positions, start):
+                                      np.searchsorted(value_positions, stop)]
+            mask[clipped - start] = True
+        return mask
+
+    def filter(self, start_date: date, end_date: date, truck_ids: list[int],
+               payment_method_id: int | None) -> pd.DataFrame:
+        """Return the transactions between two dates inclusive, for the given trucks and payment method.
+
+        An empty truck_ids or a payment_method_id of None leaves that filter off.
+        """
+        start = np.searchsorted(self.day_numbers, to_day_number(start_date), side="left")
+        stop = np.searchsorted(self.day_numbers, to_day_number(end_date), side="right")
+        if stop <= start:
+            return self.frame.iloc[0:0]
+
+        mask = None
+        if truck_ids:
+            mask = self.get_mask([self.truck_positions.get(int(truck_id), np.empty(0, dtype=np.int64))
+                                  for truck_id in truck_ids], start, stop)
+        if payment_method_id is not None:
+            payment_mask = self.get_mask(
+                [self.payment_positions.get(payment_method_id, np.empty(0, dtype=np.int64))],
+                start, stop)
+            mask = payment_mask if mask is None else mask & payment_mask
+
+        if mask is None:
+            return self.frame.iloc[start:stop]
+        return self.frame.take(np.flatnonzero(mask) + start)
@@ -0,0 +1,289 @@
+# pylint: disable=broad-exception-caught
+
+"""Checkpointed, parallel backfill of the historical truck data.
+
+Usage: python backfill.py --workers 4 [--skip-download] [--restart]
+
+Splits the historical data into one partition per truck and month. A process
+pool reads and cleans each truck's files once, slices them by month and stages
+the partitions. Each partition is then loaded in its own transaction, one at a
+time, since Redshift serialises writes to FACT_Transaction. The transaction
+replaces the rows earlier loaded from the truck's files for that month (tagged
+with a historical: source_key) and records the partition in
+ETL_Backfill_Partition, so a partition is either fully loaded and checkpointed
+or not at all. After a crash, rerunning only loads the unfinished partitions.
+The rollups are rebuilt once for the whole backfilled range at the end.
+"""
+import os
+import sys
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timezone
+import pandas as pd
+from dotenv import load_dotenv
+from t3_shared.connection import get_pool
+from extract import initialise_s3_client, download_files
+from transform import (extract_truck_id, get_source_key, list_transaction_files,
+                       load_and_clean_file, INPUT_DIR)
+from load import (copy_staged_transactions, delete_staged_transactions, get_transaction_rows,
+                  insert_transactions_batched, stage_transactions_in_s3)
+from t3_shared.rollups import refresh_rollups
+from t3_shared.report_cache import invalidate_reports
+from t3_shared.instrumentation import RunSummary
+
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", "4"))
+
+
+def get_month_bounds(month: str) -> tuple[datetime, datetime]:
+    """Return the first instant of a 'YYYY-MM' month and of the month after it."""
+    period = pd.Period(month, freq="M")
+    return period.start_time.to_pydatetime(), (period + 1).start_time.to_pydatetime()
+
+
+def plan_trucks(file_paths: list[str]) -> dict[int, list[str]]:
+    """Group the historical files by truck, since one truck's months can span several files."""
+    trucks = {}
+    for file_path in file_paths:
+        trucks.setdefault(extract_truck_id(file_path), []).append(file_path)
+    return trucks
+
+
+def get_completed_partitions(cursor) -> set[tuple[int, str]]:
+    """Retrieve the partitions already checkpointed as loaded."""
+    cursor.execute("SELECT truck_id, month FROM ETL_Backfill_Partition;")
+    return {(int(truck_id), month) for truck_id, month in cursor.fetchall()}
+
+
+def clear_checkpoints(cursor, truck_ids: list[int]) -> None:
+    """Forget every partition of the given trucks, so the next run loads them again."""
+    for truck_id in truck_ids:
+        cursor.execute("DELETE FROM ETL_Backfill_Partition WHERE truck_id = %s", (truck_id,))
+
+
+def record_checkpoint(cursor, partition: tuple[int, str], rows_loaded: int) -> None:
+    """Mark a partition as loaded, in the same transaction as its rows."""
+    truck_id, month = partition
+    cursor.execute("""
+        INSERT INTO ETL_Backfill_Partition (truck_id, month, rows_loaded, completed_at)
+        VALUES (%s, %s, %s, %s)
+    """, (truck_id, month, rows_loaded, datetime.now(timezone.utc).replace(tzinfo=None)))
+
+
+def split_by_month(df: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    """Slice cleaned transactions into one frame per 'YYYY-MM' month."""
+    months = df['timestamp'].dt.to_period("M").astype(str)
+    return {month: rows.reset_index(drop=True) for month, rows in df.groupby(months, sort=True)}
+
+
+def prepare_truck(truck_id: int, file_paths: list[str], completed_months: set[str]
+                  ) -> tuple[list[str], list[tuple[str, pd.DataFrame, str | None]]]:
+    """Read and clean a truck's files once, slice them by month and stage the pending months.
+
+    Runs on the worker processes. Returns every month in the files, and the
+    cleaned rows and staging key (None when the rows are to be inserted
+    directly) of each month not yet checkpointed.
+    """
+    df = pd.concat([load_and_clean_file(file_path) for file_path in file_paths],
+                   ignore_index=True)
+    staging_bucket = os.getenv("COPY_STAGING_BUCKET")
+    use_copy = staging_bucket and os.getenv("COPY_IAM_ROLE")
+    months = split_by_month(df)
+
+    prepared = []
+    for month, rows in months.items():
+        if month in completed_months:
+            continue
+        staging_key = (stage_transactions_in_s3(rows, staging_bucket,
+                                                f"backfill_{truck_id}_{month}")
+                       if use_copy else None)
+        prepared.append((month, rows, staging_key))
+    return list(months), prepared
+
+
+def load_partition(partition: tuple[int, str], df: pd.DataFrame, staging_key: str | None,
+                   source_keys: list[str]) -> int:
+    """Replace one partition's historical rows and checkpoint it in a single transaction.
+
+    Only rows tagged with one of the truck's historical source_keys are
+    replaced; hourly-pipeline rows and untagged rows are left alone. The staged
+    file, if any, is deleted afterwards. Returns the number of rows loaded.
+    """
+    month_start, month_end = get_month_bounds(partition[1])
+    staging_bucket = os.getenv("COPY_STAGING_BUCKET")
+    conn = get_pool().acquire()
+    conn.autocommit = False
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"SET search_path TO {os.environ['SCHEMA']};")
+            cursor.execute(f"""
+                DELETE FROM FACT_Transaction
+                WHERE at >= %s AND at < %s
+                  AND source_key IN ({", ".join(["%s"] * len(source_keys))})
+            """, [month_start, month_end, *source_keys])
+
+            if staging_key:
+                copy_staged_transactions(cursor, staging_bucket, staging_key,
+                                         os.getenv("COPY_IAM_ROLE"))
+                loaded_rows = len(df)
+            else:
+                loaded_rows = insert_transactions_batched(cursor, get_transaction_rows(df))
+
+            record_checkpoint(cursor, partition, loaded_rows)
+        conn.commit()
+        return loaded_rows
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        get_pool().release(conn)
+        if staging_key:
+            delete_staged_transactions(staging_bucket, staging_key)
+
+
+def run_trucks(trucks: dict[int, list[str]], completed: set[tuple[int, str]],
+               workers: int, record: dict) -> list[str]:
+    """Prepare each truck's partitions on a process pool and load them one at a time.
+
+    Redshift lets one transaction at a time write to FACT_Transaction, and
+    concurrent writers fail with serializable isolation errors, so only the
+    reading, cleaning and staging run in parallel. Each prepared partition is
+    committed here while the workers prepare the next trucks, and at most
+    2 * workers trucks' prepared rows wait in memory. Workers are spawned
+    rather than forked so none inherits the parent's connections. Returns every
+    month found in the files.
+    """
+    record.update(trucks=len(trucks), partitions=0, completed=0, failed=0,
+                  rows_in=0, rows_loaded=0)
+    months = set()
+    if not trucks:
+        return []
+
+    pending = iter(trucks.items())
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(trucks))),
+                             mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = {}
+
+        def submit_next() -> None:
+            if (item := next(pending, None)) is not None:
+                truck_id, file_paths = item
+                completed_months = {month for done_id, month in completed if done_id == truck_id}
+                futures[executor.submit(prepare_truck, truck_id, file_paths,
+                                        completed_months)] = truck_id
+
+        for _ in range(workers * 2):
+            submit_next()
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                truck_id = futures.pop(future)
+                submit_next()
+                try:
+                    truck_months, prepared = future.result()
+                except Exception as e:
+                    record["failed"] += 1
+                    logging.error("Error preparing truck %d: %s", truck_id, str(e))
+                    continue
+                months.update(truck_months)
+                record["partitions"] += len(prepared)
+                source_keys = [get_source_key(file_path) for file_path in trucks[truck_id]]
+                for month, df, staging_key in prepared:
+                    try:
+                        rows_loaded = load_partition((truck_id, month), df, staging_key,
+                                                     source_keys)
+                        record["completed"] += 1
+                        record["rows_in"] += len(df)
+                        record["rows_loaded"] += rows_loaded
+                        logging.info("Loaded %d rows for truck %d, %s.",
+                                     rows_loaded, truck_id, month)
+                    except Exception as e:
+                        record["failed"] += 1
+                        logging.error("Error loading truck %d, %s: %s", truck_id, month, str(e))
+    return sorted(months)
+
+
+def refresh_backfilled_rollups(months: list[str]) -> None:
+    """Rebuild the rollups once across every backfilled month and invalidate its cached reports."""
+    first_day = get_month_bounds(months[0])[0].date()
+    last_day = pd.Period(months[-1], freq="M").end_time.date()
+    conn = get_pool().acquire()
+    conn.autocommit = False
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"SET search_path TO {os.environ['SCHEMA']};")
+            refresh_rollups(cursor, [(first_day, last_day)])
+        conn.commit()
+        invalidate_reports([(first_day, last_day)])
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        get_pool().release(conn)
+
+
+def backfill(workers: int = BACKFILL_WORKERS, skip_download: bool = False,
+             restart: bool = False) -> bool:
+    """Load every unfinished historical partition, emitting a JSON run summary.
+
+    Returns True if every partition is loaded.
+    """
+    run = RunSummary("backfill")
+    try:
+        if not skip_download:
+            with run.stage("extract") as record:
+                s3 = initialise_s3_client({"ACCESS_KEY_ID": os.getenv("ACCESS_KEY_ID"),
+                                           "SECRET_ACCESS_KEY": os.getenv("SECRET_ACCESS_KEY")})
+                historical_files = download_files(
+                    s3, os.getenv("BUCKET"), "historical/", file_extension='.parquet')
+                record["files"] = len(historical_files)
+                record["bytes_downloaded"] = sum(
+                    os.path.getsize(file) for file in historical_files)
+
+        with run.stage("plan") as record:
+            file_paths = list_transaction_files(INPUT_DIR)
+            trucks = plan_trucks(file_paths)
+            with get_pool().connection() as conn, conn.cursor() as cursor:
+                cursor.execute(f"SET search_path TO {os.environ['SCHEMA']};")
+                if restart:
+                    clear_checkpoints(cursor, list(trucks))
+                completed = get_completed_partitions(cursor)
+            get_pool().close()
+            record["files"] = len(file_paths)
+            record["trucks"] = len(trucks)
+            record["checkpointed"] = len(completed)
+
+        if not trucks:
+            logging.warning("No historical files found in %s.", INPUT_DIR)
+            return True
+
+        with run.stage("load") as load_record:
+            months = run_trucks(trucks, completed, workers, load_record)
+
+        if months:
+            with run.stage("rollups"):
+                refresh_backfilled_rollups(months)
+
+        return load_record["failed"] == 0
+
+    except Exception as e:
+        logging.error("Backfill failed: %s", str(e))
+        return False
+
+    finally:
+        run.emit()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format='%(levelname)s:%(message)s', level=logging.INFO)
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Backfill the historical truck data.")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS)
+    parser.add_argument("--skip-download", action="store_true",
+                        help=f"Reuse the files already in {INPUT_DIR}.")
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignore existing checkpoints and reload every partition.")
+    args = parser.parse_args()
+
+    sys.exit(0 if backfill(args.workers, args.skip_download, args.restart) else 1)
@@ -0,0 +1,60 @@
+"""Benchmark the serial and process-pool transform over synthetic truck files.
+
+Usage: python bench_transform.py --trucks 12 --rows 500000 --workers 4
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+from transform import list_transaction_files, transform_transaction_files
+
+
+def write_truck_files(directory: str, trucks: int, rows: int) -> None:
+    """Write one historical-style .parquet file per truck, including invalid totals."""
+    rng = np.random.default_rng(7)
+    for truck_id in range(1, trucks + 1):
+        totals = (rng.integers(100, 3000, rows) / 100).astype(str).astype(object)
+        totals[rng.random(rows) < 0.02] = "VOID"
+        totals[rng.random(rows) < 0.02] = None
+        pd.DataFrame({
+            "timestamp": (pd.Timestamp("2024-01-01") + pd.to_timedelta(
+                rng.integers(0, 300 * 24 * 3600, rows), unit="s")).astype(str),
+            "type": rng.choice(["card", "Card", "cash", "CASH"], rows),
+            "total": totals
+        }).to_parquet(os.path.join(directory, f"T3_historical_{truck_id}.parquet"))
+
+
+def time_transform(file_paths: list[str], workers: int) -> tuple[float, pd.DataFrame]:
+    """Run the transform and return the elapsed time with its output."""
+    start = time.perf_counter()
+    combined = transform_transaction_files(file_paths, workers)
+    return time.perf_counter() - start, combined
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the parallel historical transform.")
+    parser.add_argument("--trucks", type=int, default=12)
+    parser.add_argument("--rows", type=int, default=500_000,
+                        help="rows per truck file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    input_dir = tempfile.mkdtemp()
+    try:
+        write_truck_files(input_dir, args.trucks, args.rows)
+        file_paths = list_transaction_files(input_dir)
+
+        serial_time, serial_output = time_transform(file_paths, workers=1)
+        parallel_time, parallel_output = time_transform(file_paths, args.workers)
+        pd.testing.assert_frame_equal(serial_output, parallel_output)
+
+        print(f"serial       {serial_time:>7.2f}s {len(serial_output):>12,} rows")
+        print(f"{args.workers:>2} workers   {parallel_time:>7.2f}s "
+              f"{len(parallel_output):>12,} rows (identical output)")
+        print(f"speedup      {serial_time / parallel_time:>7.1f}x")
+    finally:
+        shutil.rmtree(input_dir)
@@ -5,12 +5,16 @@ import os
 import logging
 from dotenv import load_dotenv
 from extract import initialise_s3_client, download_files
-from transform import combine_transaction_data_files
+from transform import (combine_transaction_data_files, count_parquet_rows,
+                       list_transaction_files, OUTPUT_DIR)
 from load import upload_transaction_data
+from t3_shared.instrumentation import RunSummary
+
+INPUT_DIR = "data/historical"
 
 
 def etl_pipeline():
-    """Run the full ETL pipeline."""
+    """Run the full ETL pipeline, emitting a JSON summary of every stage."""
 
     load_dotenv()
 
@@ -19,25 +23,39 @@ def etl_pipeline():
         "SECRET_ACCESS_KEY": os.getenv("SECRET_ACCESS_KEY")
     }
 
+    run = RunSummary("pipeline")
+
     try:
-        s3 = initialise_s3_client(config)
-        historical_files = download_files(
-            s3, os.getenv("BUCKET"), "historical/", file_extension='.parquet')
+        with run.stage("extract") as record:
+            s3 = initialise_s3_client(config)
+            historical_files = download_files(
+                s3, os.getenv("BUCKET"), "historical/", file_extension='.parquet')
+            record["files"] = len(historical_files)
+            record["bytes_downloaded"] = sum(
+                os.path.getsize(file) for file in historical_files)
 
         if not historical_files:
             logging.warning("No historical files downloaded.")
             return
 
-        combine_transaction_data_files(
-            "data/historical", "data/historical/combined_transactions.csv")
+        with run.stage("transform") as record:
+            record["rows_in"] = count_parquet_rows(list_transaction_files(INPUT_DIR))
+            cleaned_rows = combine_transaction_data_files(INPUT_DIR, OUTPUT_DIR)
+            record["rows_out"] = cleaned_rows
+            record["rows_rejected"] = record["rows_in"] - cleaned_rows
 
-        upload_transaction_data("data/historical/combined_transactions.csv")
+        with run.stage("load") as record:
+            record["rows_in"] = cleaned_rows
+            record["rows_loaded"] = upload_transaction_data(OUTPUT_DIR)
 
         logging.info("ETL pipeline completed successfully.")
 
     except Exception as e:
         logging.error("ETL pipeline failed: %s", str(e))
 
+    finally:
+        run.emit()
+
 
 if __name__ == "__main__":
     logging.basicConfig(format='%(levelname)s:%(message)s', level=logging.INFO)
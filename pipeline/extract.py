@@ -2,23 +2,34 @@
 
 """Import libraries"""
 import os
+import time
 import logging
-from typing import List
+from typing import Callable, Iterable, Iterator, List, Optional
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
 from dotenv import dotenv_values
 from boto3 import client, Session
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 
 logging.basicConfig(format='%(levelname)s:%(message)s', level=logging.DEBUG)
 
 BUCKET = "sigma-resources-truck"
 HISTORICAL_PREFIX = "historical/"
 METADATA_PREFIX = "metadata/"
+MAX_WORKERS = int(os.getenv("S3_MAX_WORKERS", "8"))
+DOWNLOAD_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 0.5
+# Parallelism comes from the worker pool, so each transfer stays on its own thread.
+TRANSFER_CONFIG = TransferConfig(use_threads=False)
 
 
 def initialise_s3_client(config: dict) -> Session.client:
     """Initialise and return the S3 client."""
     try:
         s3 = client("s3", aws_access_key_id=config["ACCESS_KEY_ID"],
-                    aws_secret_access_key=config["SECRET_ACCESS_KEY"])
+                    aws_secret_access_key=config["SECRET_ACCESS_KEY"],
+                    config=Config(max_pool_connections=max(MAX_WORKERS, 10)))
         logging.info("S3 client initialised successfully.")
         return s3
     except Exception as e:
@@ -26,29 +37,74 @@ def initialise_s3_client(config: dict) -> Session.client:
         raise
 
 
-def download_files(s3, bucket: str, prefix: str, file_extension: str) -> List[str]:
-    """Downloads relevant .parquet truck data files from S3 to the data/historical/ folder."""
+def iter_object_keys(s3, bucket: str, prefix: str, file_extension: str = "") -> Iterator[str]:
+    """Lazily yield the keys under a prefix, one listing page at a time."""
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            if obj["Key"].endswith(file_extension):
+                yield obj["Key"]
+
+
+def bounded_map(executor: Executor, func: Callable, items: Iterable, window: int) -> Iterator:
+    """Like executor.map, but only pulls from items while fewer than window calls are pending."""
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def download_file_with_retry(s3, bucket: str, file_key: str, local_file_path: str,
+                             retries: int = DOWNLOAD_RETRIES) -> str:
+    """Download a single file from S3, retrying with exponential backoff on failure."""
+    for attempt in range(1, retries + 1):
+        try:
+            s3.download_file(bucket, file_key, local_file_path,
+                             Config=TRANSFER_CONFIG)
+            logging.info("Downloaded file: %s", file_key)
+            return local_file_path
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+            logging.warning("Retrying %s in %.1fs (attempt %d of %d): %s",
+                            file_key, delay, attempt, retries, str(e))
+            time.sleep(delay)
+    return local_file_path
+
+
+def download_files(s3, bucket: str, prefix: str, file_extension: str,
+                   max_workers: int = MAX_WORKERS) -> List[str]:
+    """Downloads relevant .parquet truck data files from S3 to the data/historical/ folder.
+
+    Keys are listed page by page and downloaded concurrently as they arrive;
+    paths are returned in listing order.
+    """
     try:
-        response = s3.list_objects_v2(Bucket=bucket, Prefix=prefix)
+        os.makedirs(f"data/{prefix}", exist_ok=True)
 
-        if 'Contents' not in response:
+        def download(file_key: str) -> Optional[str]:
+            try:
+                return download_file_with_retry(
+                    s3, bucket, file_key, os.path.join("data", file_key))
+            except Exception as e:
+                logging.error("Error downloading file %s: %s", file_key, str(e))
+                return None
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            downloaded_files = [
+                path for path in bounded_map(
+                    executor, download,
+                    iter_object_keys(s3, bucket, prefix, file_extension),
+                    window=max_workers * 2)
+                if path]
+
+        if not downloaded_files:
             logging.warning(
                 "No files found with prefix '%s' in bucket '%s'", prefix, bucket)
-            return []
-
-        downloaded_files = []
-        os.makedirs(f"data/{prefix}", exist_ok=True)
-
-        for obj in response['Contents']:
-            file_key = obj['Key']
-
-            if not file_key.endswith(file_extension):
-                continue
-
-            local_file_path = os.path.join("data", file_key)
-            s3.download_file(bucket, file_key, local_file_path)
-            downloaded_files.append(local_file_path)
-            logging.info("Downloaded file: %s", file_key)
 
         return downloaded_files
     except Exception as e:
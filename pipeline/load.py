@@ -2,57 +2,147 @@
 
 """Import modules"""
 import os
+import io
+import gzip
 import logging
+from datetime import date, datetime, timezone
+import boto3
 import pandas as pd
-import redshift_connector
+import pyarrow.parquet as pq
 from dotenv import load_dotenv
+from t3_shared.connection import get_pool
+from t3_shared.transaction_schema import cast_transactions
+from t3_shared.rollups import refresh_rollups
+from t3_shared.report_cache import invalidate_reports
 
+LOAD_CHUNK_SIZE = int(os.getenv("LOAD_CHUNK_SIZE", "5000"))
+MAX_BIND_PARAMETERS = 32767
+COPY_STAGING_PREFIX = "staging/"
 
-def get_redshift_connection():
-    """Establish and return a connection to the Redshift database."""
+TRANSACTION_COLUMNS = ["truck_id", "payment_method_id", "total", "timestamp", "source_key"]
+INSERT_COLUMNS = "(truck_id, payment_method_id, total, at, source_key)"
+
+
+def get_transaction_rows(df: pd.DataFrame) -> list[tuple]:
+    """Convert the transaction columns of a DataFrame into native Python row tuples."""
+    return list(zip(*(df[column].tolist() for column in TRANSACTION_COLUMNS)))
+
+
+def insert_transactions_batched(cursor, rows: list[tuple], chunk_size: int = LOAD_CHUNK_SIZE) -> int:
+    """Insert rows into FACT_Transaction with one multi-row VALUES statement per chunk."""
+    chunk_size = max(1, min(chunk_size, MAX_BIND_PARAMETERS // len(TRANSACTION_COLUMNS)))
+    row_placeholder = f"({', '.join(['%s'] * len(TRANSACTION_COLUMNS))})"
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        insert_query = f"""
+        INSERT INTO FACT_Transaction {INSERT_COLUMNS}
+        VALUES {", ".join([row_placeholder] * len(chunk))};
+        """
+        cursor.execute(insert_query, [value for row in chunk for value in row])
+
+    return len(rows)
+
+
+def get_frame_day_range(df: pd.DataFrame) -> tuple[date, date] | None:
+    """Return the first and last day covered by a batch of transactions."""
+    if df.empty:
+        return None
+    return df['timestamp'].min().date(), df['timestamp'].max().date()
+
+
+def stage_transactions_csv(df: pd.DataFrame) -> bytes:
+    """Serialise the transaction columns to a gzip-compressed CSV for COPY."""
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb") as gz_file:
+        gz_file.write(df[TRANSACTION_COLUMNS].to_csv(index=False).encode("utf-8"))
+    return buffer.getvalue()
+
+
+def get_s3_client():
+    """Create the S3 client used to stage COPY files."""
+    return boto3.client("s3", aws_access_key_id=os.getenv("ACCESS_KEY_ID"),
+                        aws_secret_access_key=os.getenv("SECRET_ACCESS_KEY"))
+
+
+def stage_transactions_in_s3(df: pd.DataFrame, bucket: str, name: str = "fact_transaction") -> str:
+    """Upload the batch to the staging prefix as a gzip-compressed CSV and return its key."""
+    staging_key = (f"{COPY_STAGING_PREFIX}{name}_"
+                   f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')}.csv.gz")
+    get_s3_client().put_object(Bucket=bucket, Key=staging_key, Body=stage_transactions_csv(df))
+    return staging_key
+
+
+def copy_staged_transactions(cursor, bucket: str, staging_key: str, iam_role: str) -> None:
+    """Load a staged CSV into FACT_Transaction with a single COPY."""
+    cursor.execute(f"""
+    COPY FACT_Transaction {INSERT_COLUMNS}
+    FROM 's3://{bucket}/{staging_key}'
+    IAM_ROLE '{iam_role}'
+    CSV GZIP IGNOREHEADER 1 TIMEFORMAT 'auto';
+    """)
+
+
+def delete_staged_transactions(bucket: str, staging_key: str) -> None:
+    """Remove a staged CSV once its COPY has run."""
+    get_s3_client().delete_object(Bucket=bucket, Key=staging_key)
+
+
+def copy_transactions_from_s3(cursor, df: pd.DataFrame, bucket: str, iam_role: str) -> int:
+    """Stage the batch in S3 and load it into FACT_Transaction with a single COPY."""
+    staging_key = stage_transactions_in_s3(df, bucket)
     try:
-        conn = redshift_connector.connect(
-            host=os.environ["HOST"],
-            port=int(os.environ.get("PORT", 5439)),
-            user=os.environ["USERNAME"],
-            password=os.environ["PASSWORD"],
-            database=os.environ["DATABASE_NAME"]
-        )
-        conn.autocommit = True
-        logging.info("Connected to Redshift.")
-        return conn
-    except Exception as e:
-        logging.error("Error connecting to Redshift: %s", str(e))
-        raise
+        copy_staged_transactions(cursor, bucket, staging_key, iam_role)
+    finally:
+        delete_staged_transactions(bucket, staging_key)
+    return len(df)
+
+
+def read_staged_transactions(data_path: str) -> pd.DataFrame:
+    """Read a staged Parquet file or partitioned dataset with its stored dtypes."""
+    return cast_transactions(pq.read_table(data_path, columns=TRANSACTION_COLUMNS).to_pandas())
+
 
+def upload_transaction_data(data_file: str, chunk_size: int = LOAD_CHUNK_SIZE) -> int | None:
+    """Uploads transaction data to Redshift database in a single transaction.
 
-def upload_transaction_data(data_file):
-    """Uploads transaction data to Redshift database."""
-    df = pd.read_csv(data_file)
-    df = df.head(1000)
-    conn = get_redshift_connection()
+    The daily and hourly rollups for the loaded days are rebuilt in the same
+    transaction, and the cached reports for those days are invalidated. Uses a
+    staged S3 COPY when COPY_STAGING_BUCKET and COPY_IAM_ROLE are set, otherwise
+    falls back to batched multi-row INSERT statements. Returns the number of
+    rows loaded, or None if the upload was rolled back.
+    """
+    df = read_staged_transactions(data_file)
+    conn = get_pool().acquire()
+    conn.autocommit = False
     try:
         with conn.cursor() as cursor:
             cursor.execute(f"SET search_path TO {os.environ['SCHEMA']};")
-            insert_query = """
-            INSERT INTO FACT_Transaction (truck_id, payment_method_id, total, at)
-            VALUES (%s, %s, %s, %s);
-            """
-            for _, row in df.iterrows():
-                cursor.execute(insert_query, (
-                    row['truck_id'],
-                    row['payment_method_id'],
-                    row['total'],
-                    row['timestamp']
-                ))
-
-            logging.info("Data loaded to Redshift.")
+            staging_bucket = os.getenv("COPY_STAGING_BUCKET")
+            iam_role = os.getenv("COPY_IAM_ROLE")
+
+            if staging_bucket and iam_role:
+                loaded_rows = copy_transactions_from_s3(
+                    cursor, df, staging_bucket, iam_role)
+            else:
+                loaded_rows = insert_transactions_batched(
+                    cursor, get_transaction_rows(df), chunk_size)
+
+            day_ranges = [get_frame_day_range(df)]
+            refresh_rollups(cursor, day_ranges)
+
+        conn.commit()
+        logging.info("Uploaded %d rows to Redshift.", loaded_rows)
+        invalidate_reports(day_ranges)
+        return loaded_rows
 
     except Exception as e:
+        conn.rollback()
         logging.error("Error uploading data: %s", str(e))
+        return None
 
     finally:
-        conn.close()
+        get_pool().release(conn)
 
 
 if __name__ == "__main__":
@@ -60,7 +150,7 @@ if __name__ == "__main__":
     load_dotenv()
 
     data = os.getenv(
-        "DATA_FILE", "data/historical/combined_transactions.csv")
+        "DATA_FILE", "data/staging/combined_transactions")
 
     if os.path.exists(data):
         logging.info("Starting data upload for file: %s", data)
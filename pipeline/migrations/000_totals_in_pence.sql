@@ -0,0 +1,10 @@
+-- Converts FACT_Transaction.total from the whole pounds the original loaders
+-- stored to the integer pence the current loaders write. Run it before every
+-- other migration, with both ETLs stopped and before deploying the loaders
+-- that write pence: every row present when it runs is taken to be in pounds.
+-- Running it first means 002 backfills the rollups in pence. On a database
+-- where 002 has already run, delete the rollup rows and re-run 002's two
+-- INSERT statements after this migration.
+SET search_path TO ellie_bradley_schema;
+
+UPDATE FACT_Transaction SET total = total * 100;
@@ -0,0 +1,12 @@
+-- Adds the processed-object manifest and the per-object dedupe key used by the
+-- hourly pipeline. Run once against databases created from an older schema.sql.
+SET search_path TO ellie_bradley_schema;
+
+ALTER TABLE FACT_Transaction ADD COLUMN source_key VARCHAR(512);
+
+CREATE TABLE IF NOT EXISTS ETL_Processed_Object (
+    object_key VARCHAR(512) PRIMARY KEY,
+    etag VARCHAR(64) NOT NULL,
+    size BIGINT NOT NULL,
+    processed_at TIMESTAMP NOT NULL
+);
@@ -0,0 +1,36 @@
+-- Creates the daily and hourly truck summary rollups and backfills them from
+-- every transaction already in FACT_Transaction.
+SET search_path TO ellie_bradley_schema;
+
+-- Pre-aggregated summaries maintained by the load stage; revenue is in pence
+CREATE TABLE AGG_Hourly_Truck_Summary (
+    day DATE NOT NULL,
+    hour SMALLINT NOT NULL,
+    truck_id SMALLINT NOT NULL,
+    payment_method_id SMALLINT NOT NULL,
+    transaction_count INT NOT NULL,
+    total_revenue BIGINT NOT NULL,
+    PRIMARY KEY (day, hour, truck_id, payment_method_id)
+);
+
+CREATE TABLE AGG_Daily_Truck_Summary (
+    day DATE NOT NULL,
+    truck_id SMALLINT NOT NULL,
+    payment_method_id SMALLINT NOT NULL,
+    transaction_count INT NOT NULL,
+    total_revenue BIGINT NOT NULL,
+    PRIMARY KEY (day, truck_id, payment_method_id)
+);
+
+INSERT INTO AGG_Hourly_Truck_Summary
+    (day, hour, truck_id, payment_method_id, transaction_count, total_revenue)
+SELECT CAST(at AS DATE), EXTRACT(HOUR FROM at), truck_id, payment_method_id,
+       COUNT(*), SUM(total)
+FROM FACT_Transaction
+GROUP BY 1, 2, 3, 4;
+
+INSERT INTO AGG_Daily_Truck_Summary
+    (day, truck_id, payment_method_id, transaction_count, total_revenue)
+SELECT day, truck_id, payment_method_id, SUM(transaction_count), SUM(total_revenue)
+FROM AGG_Hourly_Truck_Summary
+GROUP BY 1, 2, 3;
@@ -0,0 +1,21 @@
+-- Adds the sort keys and distribution styles declared in schema.sql to an
+-- existing database. Redshift re-sorts in the background; run
+-- VACUUM SORT ONLY FACT_Transaction; afterwards (outside a transaction block)
+-- to finish immediately.
+SET search_path TO ellie_bradley_schema;
+
+ALTER TABLE DIM_Truck ALTER DISTSTYLE ALL;
+ALTER TABLE DIM_Payment_Method ALTER DISTSTYLE ALL;
+
+ALTER TABLE FACT_Transaction ALTER DISTSTYLE EVEN;
+ALTER TABLE FACT_Transaction ALTER SORTKEY (at);
+
+ALTER TABLE ETL_Processed_Object ALTER SORTKEY (object_key);
+
+ALTER TABLE AGG_Hourly_Truck_Summary ALTER DISTSTYLE ALL;
+ALTER TABLE AGG_Hourly_Truck_Summary ALTER SORTKEY (day);
+
+ALTER TABLE AGG_Daily_Truck_Summary ALTER DISTSTYLE ALL;
+ALTER TABLE AGG_Daily_Truck_Summary ALTER SORTKEY (day);
+
+ANALYZE FACT_Transaction;
@@ -0,0 +1,11 @@
+-- Adds the checkpoint table backfill.py uses to resume an interrupted
+-- historical backfill. Run once against databases created from an older schema.sql.
+SET search_path TO ellie_bradley_schema;
+
+CREATE TABLE IF NOT EXISTS ETL_Backfill_Partition (
+    truck_id SMALLINT NOT NULL,
+    month CHAR(7) NOT NULL,
+    rows_loaded INT NOT NULL,
+    completed_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (truck_id, month)
+);
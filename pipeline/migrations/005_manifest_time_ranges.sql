@@ -0,0 +1,19 @@
+-- Stores the time range of each processed object's rows in the manifest, so a
+-- reload only deletes within that range and brand-new objects skip the delete.
+-- first_at and last_at stay NULL for objects that loaded no rows. Run once
+-- against databases created from an older schema.sql, with the hourly ETL stopped.
+SET search_path TO ellie_bradley_schema;
+
+ALTER TABLE ETL_Processed_Object ADD COLUMN first_at TIMESTAMP;
+ALTER TABLE ETL_Processed_Object ADD COLUMN last_at TIMESTAMP;
+
+-- One full scan now, instead of one per hourly run.
+UPDATE ETL_Processed_Object
+SET first_at = loaded.first_at, last_at = loaded.last_at
+FROM (
+    SELECT source_key, MIN(at) AS first_at, MAX(at) AS last_at
+    FROM FACT_Transaction
+    WHERE source_key IS NOT NULL
+    GROUP BY source_key
+) AS loaded
+WHERE ETL_Processed_Object.object_key = loaded.source_key;
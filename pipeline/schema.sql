@@ -2,6 +2,10 @@
 SET search_path TO ellie_bradley_schema;
 
 -- Drop tables if they already exist
+DROP TABLE IF EXISTS AGG_Daily_Truck_Summary;
+DROP TABLE IF EXISTS AGG_Hourly_Truck_Summary;
+DROP TABLE IF EXISTS ETL_Backfill_Partition;
+DROP TABLE IF EXISTS ETL_Processed_Object;
 DROP TABLE IF EXISTS FACT_Transaction;
 DROP TABLE IF EXISTS DIM_Truck;
 DROP TABLE IF EXISTS DIM_Payment_Method;
@@ -13,18 +17,70 @@ CREATE TABLE DIM_Truck (
     truck_description TEXT,
     has_card_reader BOOLEAN,
     fsa_rating SMALLINT
-);
+)
+DISTSTYLE ALL;
 
 CREATE TABLE DIM_Payment_Method (
     payment_method_id SMALLINT PRIMARY KEY,
     payment_method VARCHAR(50) NOT NULL
-);
+)
+DISTSTYLE ALL;
 
+-- Sorted on at so time-range predicates prune blocks via zone maps. Distributed
+-- evenly because six trucks would skew a truck_id DISTKEY; joins to the
+-- dimensions stay local because those are replicated to every node.
 CREATE TABLE FACT_Transaction (
     transaction_id BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
     truck_id SMALLINT REFERENCES DIM_Truck(truck_id),
     payment_method_id SMALLINT REFERENCES DIM_Payment_Method(payment_method_id),
     total INT,
-    at TIMESTAMP NOT NULL
+    at TIMESTAMP NOT NULL,
+    source_key VARCHAR(512)
+)
+DISTSTYLE EVEN
+SORTKEY (at);
+
+-- S3 objects already loaded by the hourly pipeline, keyed by object version,
+-- with the time range of their rows (NULL if they loaded none)
+CREATE TABLE ETL_Processed_Object (
+    object_key VARCHAR(512) PRIMARY KEY,
+    etag VARCHAR(64) NOT NULL,
+    size BIGINT NOT NULL,
+    processed_at TIMESTAMP NOT NULL,
+    first_at TIMESTAMP,
+    last_at TIMESTAMP
+)
+SORTKEY (object_key);
+
+-- Historical backfill partitions (truck x month) committed by backfill.py
+CREATE TABLE ETL_Backfill_Partition (
+    truck_id SMALLINT NOT NULL,
+    month CHAR(7) NOT NULL,
+    rows_loaded INT NOT NULL,
+    completed_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (truck_id, month)
 );
 
+-- Pre-aggregated summaries maintained by the load stage; revenue is in pence
+CREATE TABLE AGG_Hourly_Truck_Summary (
+    day DATE NOT NULL,
+    hour SMALLINT NOT NULL,
+    truck_id SMALLINT NOT NULL,
+    payment_method_id SMALLINT NOT NULL,
+    transaction_count INT NOT NULL,
+    total_revenue BIGINT NOT NULL,
+    PRIMARY KEY (day, hour, truck_id, payment_method_id)
+)
+DISTSTYLE ALL
+SORTKEY (day);
+
+CREATE TABLE AGG_Daily_Truck_Summary (
+    day DATE NOT NULL,
+    truck_id SMALLINT NOT NULL,
+    payment_method_id SMALLINT NOT NULL,
+    transaction_count INT NOT NULL,
+    total_revenue BIGINT NOT NULL,
+    PRIMARY KEY (day, truck_id, payment_method_id)
+)
+DISTSTYLE ALL
+SORTKEY (day);
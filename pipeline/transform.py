@@ -1,59 +1,145 @@
 """Import libraries"""
 import os
+import shutil
 import logging
+from typing import List, Optional
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from t3_shared.transaction_schema import cast_transactions
 
 
 INPUT_DIR = 'data/historical'
-OUTPUT_FILE = 'data/historical/combined_transactions.csv'
+OUTPUT_DIR = 'data/staging/combined_transactions'
+PARTITION_COLUMNS = ['month', 'truck_id']
 
 CARD_PAYMENT_ID = 1
 CASH_PAYMENT_ID = 2
+PAYMENT_METHOD_IDS = {'card': CARD_PAYMENT_ID, 'cash': CASH_PAYMENT_ID}
+PENCE_PER_POUND = 100
+RAW_COLUMNS = ('timestamp', 'type', 'total')
+HISTORICAL_SOURCE_PREFIX = 'historical:'
 
+TRANSFORM_WORKERS = int(os.getenv("TRANSFORM_WORKERS", "0")) or os.cpu_count() or 1
 
-def extract_truck_id(file_path: str) -> str:
+
+def extract_truck_id(file_path: str) -> int:
     """Extract truck ID from filename."""
     filename = os.path.basename(file_path)
-    truck_id = filename.split('_')[-1].replace('.parquet', '')
+    truck_id = int(filename.split('_')[-1].replace('.parquet', ''))
     return truck_id
 
 
+def map_payment_method_ids(payment_types: pd.Series) -> np.ndarray:
+    """Map payment type labels to ids once per distinct label rather than once per row.
+
+    Unknown and missing labels map to 0.
+    """
+    labels = payment_types.astype('category')
+    lookup = np.array(
+        [PAYMENT_METHOD_IDS.get(str(label).lower(), 0) for label in labels.cat.categories] + [0],
+        dtype=np.int8)
+    return lookup[labels.cat.codes.to_numpy()]
+
+
+def build_clean_frame(df: pd.DataFrame, valid: np.ndarray, timestamp: np.ndarray,
+                      payment_method_id: np.ndarray, total: np.ndarray) -> pd.DataFrame:
+    """Build the cleaned frame in one pass from the valid rows of each column."""
+    cleaned = {column: df[column].to_numpy()[valid]
+               for column in df.columns if column not in RAW_COLUMNS}
+    cleaned['payment_method_id'] = payment_method_id[valid]
+    cleaned['total'] = np.rint(total[valid] * PENCE_PER_POUND).astype(np.int32)
+    cleaned['timestamp'] = timestamp[valid]
+    return pd.DataFrame(cleaned)
+
+
 def clean_data(df: pd.DataFrame) -> pd.DataFrame:
-    """Clean the DataFrame by removing invalid rows and converting data types."""
-    df = df[df['total'].notnull() & (df['total'] != 0) &
-            (df['total'] != 'VOID')]
-    df['total'] = pd.to_numeric(df['total'], errors='coerce')
-    df = df.dropna(subset=['total'])
-
-    df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-    df = df.dropna(subset=['timestamp'])
-
-    df['type'] = df['type'].str.lower().replace(
-        {'card': CARD_PAYMENT_ID, 'cash': CASH_PAYMENT_ID})
-    df = df.rename(columns={'type': 'payment_method_id'})
-    df['payment_method_id'] = df['payment_method_id'].astype(int)
+    """Clean the DataFrame by removing invalid rows and converting data types.
+
+    Blank, zero and "VOID" totals are dropped and the rest converted from pounds
+    to integer pence, all through a single boolean mask.
+    """
+    total = pd.to_numeric(df['total'], errors='coerce').to_numpy(dtype=np.float64)
+    # Zoned timestamps are stored as naive UTC; naive ones are taken to be UTC already.
+    timestamp = pd.to_datetime(
+        df['timestamp'], errors='coerce', utc=True).dt.tz_localize(None).to_numpy()
+    payment_method_id = map_payment_method_ids(df['type'])
+
+    valid = (~np.isnan(total) & (total != 0) &
+             (payment_method_id > 0) & ~np.isnat(timestamp))
+
+    df = build_clean_frame(df, valid, timestamp, payment_method_id, total)
     logging.info("Data cleaning complete.")
     return df
 
 
-def combine_transaction_data_files(input_dir: str, output_file: str) -> None:
-    """Combine all .parquet files in input_dir into a single CSV file."""
-    all_truck_data = []
+def list_transaction_files(input_dir: str) -> List[str]:
+    """List the .parquet files in input_dir in a stable order."""
+    return [os.path.join(input_dir, file_name)
+            for file_name in sorted(os.listdir(input_dir))
+            if file_name.endswith('.parquet')]
+
+
+def count_parquet_rows(file_paths: List[str]) -> int:
+    """Count the rows in .parquet files from their footers, without reading any data."""
+    return sum(pq.ParquetFile(file_path).metadata.num_rows for file_path in file_paths)
+
+
+def get_source_key(file_path: str) -> str:
+    """Return the source_key tagging the rows loaded from one historical file."""
+    return f"{HISTORICAL_SOURCE_PREFIX}{os.path.basename(file_path)}"
+
+
+def load_and_clean_file(file_path: str) -> pd.DataFrame:
+    """Read a single truck's .parquet file and clean it, tagging the rows with their source file."""
+    trucks = pd.read_parquet(file_path)
+    trucks['truck_id'] = extract_truck_id(file_path)
+    return cast_transactions(clean_data(trucks).assign(source_key=get_source_key(file_path)))
+
+
+def transform_transaction_files(file_paths: List[str],
+                                workers: Optional[int] = None) -> pd.DataFrame:
+    """Clean each truck's file, across a process pool when workers > 1, and combine them.
+
+    Results are concatenated once in the order of file_paths, so the output is
+    identical to the serial path.
+    """
+    workers = min(workers or TRANSFORM_WORKERS, len(file_paths))
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            all_truck_data = list(executor.map(load_and_clean_file, file_paths))
+    else:
+        all_truck_data = [load_and_clean_file(file_path) for file_path in file_paths]
+
+    return pd.concat(all_truck_data, ignore_index=True)
+
+
+def save_transactions_parquet(df: pd.DataFrame, output_dir: str) -> None:
+    """Replace output_dir with a compressed Parquet dataset partitioned by month and truck."""
+    table = pa.Table.from_pandas(
+        df.assign(month=df['timestamp'].dt.to_period('M').astype(str)),
+        preserve_index=False)
+    shutil.rmtree(output_dir, ignore_errors=True)
+    pq.write_to_dataset(table, output_dir, partition_cols=PARTITION_COLUMNS,
+                        compression='zstd')
 
-    for file_name in os.listdir(input_dir):
-        if file_name.endswith('.parquet'):
-            file_path = os.path.join(input_dir, file_name)
-            trucks = pd.read_parquet(file_path)
 
-            trucks['truck_id'] = extract_truck_id(file_path)
-            trucks = clean_data(trucks)
-            all_truck_data.append(trucks)
+def combine_transaction_data_files(input_dir: str, output_dir: str,
+                                   workers: Optional[int] = None) -> int:
+    """Combine all .parquet files in input_dir into a single partitioned Parquet dataset.
 
-    combined_df = pd.concat(all_truck_data, ignore_index=True)
-    combined_df.to_csv(output_file, index=False)
-    logging.info("Combined transaction data saved to %s", output_file)
+    Returns the number of cleaned rows saved.
+    """
+    combined_df = transform_transaction_files(
+        list_transaction_files(input_dir), workers)
+    save_transactions_parquet(combined_df, output_dir)
+    logging.info("Combined transaction data saved to %s", output_dir)
+    return len(combined_df)
 
 
 if __name__ == "__main__":
     logging.basicConfig(format='%(levelname)s:%(message)s', level=logging.INFO)
-    combine_transaction_data_files(INPUT_DIR, OUTPUT_FILE)
+    combine_transaction_data_files(INPUT_DIR, OUTPUT_DIR)
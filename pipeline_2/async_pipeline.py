@@ -0,0 +1,191 @@
+# pylint: disable=broad-exception-caught
+
+"""Pipelined ETL mode in which extract, transform and load overlap.
+
+Files are fetched on worker threads and each one is parsed as soon as it
+arrives. Cleaned files are grouped into batches, and each batch is loaded
+while the next files download. Bounded asyncio queues join the stages.
+Backpressure keeps the task inside its memory limit:
+- Fetching waits while PIPELINE_MEMORY_BUDGET_MB of raw CSV is fetched but
+  not yet parsed.
+- Parsing waits while LOAD_QUEUE_SIZE cleaned batches of up to
+  PIPELINE_BATCH_ROWS rows are queued for loading.
+Wall time approaches that of the slowest stage rather than the sum of all three.
+"""
+import os
+import time
+import asyncio
+import logging
+import pandas as pd
+from extract import MAX_WORKERS, get_hour_prefix, iter_objects_by_date_and_hour, read_file_with_retry
+from transform import load_data_from_buffers, clean_data
+from load import fetch_processed_objects, upload_transaction_frame
+from manifest import iter_unprocessed_objects
+
+MEMORY_BUDGET_BYTES = int(float(os.getenv("PIPELINE_MEMORY_BUDGET_MB", "64")) * 1024 ** 2)
+BATCH_ROWS = int(os.getenv("PIPELINE_BATCH_ROWS", "50000"))
+RAW_QUEUE_SIZE = MAX_WORKERS * 2
+LOAD_QUEUE_SIZE = 2
+
+
+class MemoryBudget:
+    """Caps the bytes in flight; acquiring waits until enough has been released."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+        self.peak = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, size: int) -> None:
+        """Reserve size bytes, waiting for room. An oversized item is let through on its own."""
+        async with self._condition:
+            await self._condition.wait_for(
+                lambda: self.in_use == 0 or self.in_use + size <= self.limit)
+            self.in_use += size
+            self.peak = max(self.peak, self.in_use)
+
+    async def release(self, size: int) -> None:
+        """Return size bytes to the budget."""
+        async with self._condition:
+            self.in_use -= size
+            self._condition.notify_all()
+
+
+async def run_timed(record: dict, key: str, func, *args, **kwargs):
+    """Run a blocking call on a worker thread, adding its duration to record[key]."""
+    start = time.perf_counter()
+    try:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    finally:
+        record[key] = round(record.get(key, 0) + time.perf_counter() - start, 3)
+
+
+def list_new_objects(s3_client, bucket: str, datetime_str: str) -> list[dict]:
+    """List the hour's S3 objects that are new or have changed since they were loaded."""
+    processed = fetch_processed_objects(get_hour_prefix(datetime_str))
+    return list(iter_unprocessed_objects(
+        iter_objects_by_date_and_hour(s3_client, bucket, datetime_str), processed))
+
+
+def transform_file(file_key: str, contents: bytes) -> tuple[pd.DataFrame, int, bool]:
+    """Parse and clean one raw file.
+
+    Returns the cleaned rows, the raw row count and whether the file parsed.
+    """
+    raw_data, loaded_keys = load_data_from_buffers([(file_key, contents)])
+    parsed = file_key in loaded_keys
+    if raw_data.empty:
+        return raw_data, 0, parsed
+    return clean_data(raw_data), len(raw_data), parsed
+
+
+async def extract_files(s3_client, bucket: str, datetime_strs: list[str],
+                        raw_queue: asyncio.Queue, budget: MemoryBudget, record: dict) -> None:
+    """Fetch each hour's new files on MAX_WORKERS threads and queue them as they arrive."""
+    start = time.perf_counter()
+    slots = asyncio.Semaphore(MAX_WORKERS)
+
+    async def fetch(obj: dict) -> None:
+        try:
+            contents = await asyncio.to_thread(read_file_with_retry, s3_client, bucket, obj["Key"])
+        except Exception as e:
+            logging.error("Error reading file %s: %s", obj["Key"], str(e))
+            await budget.release(obj["Size"])
+            return
+        finally:
+            slots.release()
+        record["files"] += 1
+        record["bytes_downloaded"] += len(contents)
+        await raw_queue.put((obj, contents))
+
+    async with asyncio.TaskGroup() as group:
+        for datetime_str in datetime_strs:
+            objects = await asyncio.to_thread(list_new_objects, s3_client, bucket, datetime_str)
+            if not objects:
+                logging.info("No new data files found for datetime %s.", datetime_str)
+            for obj in objects:
+                await budget.acquire(obj["Size"])
+                await slots.acquire()
+                group.create_task(fetch(obj))
+
+    await raw_queue.put(None)
+    record["extract_seconds"] = round(time.perf_counter() - start, 3)
+
+
+async def transform_files(raw_queue: asyncio.Queue, load_queue: asyncio.Queue,
+                          budget: MemoryBudget, record: dict) -> None:
+    """Clean each file as it arrives and queue the results in batches of about BATCH_ROWS rows."""
+    frames, objects, skipped, rows = [], [], [], 0
+
+    async def flush() -> None:
+        nonlocal frames, objects, skipped, rows
+        if objects or skipped:
+            batch = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+            await load_queue.put((batch, objects, skipped))
+        frames, objects, skipped, rows = [], [], [], 0
+
+    while (item := await raw_queue.get()) is not None:
+        obj, contents = item
+        try:
+            cleaned_data, rows_in, parsed = await run_timed(
+                record, "transform_seconds", transform_file, obj["Key"], contents)
+        finally:
+            del contents, item
+            await budget.release(obj["Size"])
+
+        if not parsed:
+            # Recorded without rows, so its earlier rows stay and it is not fetched again.
+            record["files_failed"] += 1
+            skipped.append(obj)
+            continue
+        record["rows_in"] += rows_in
+        record["rows_out"] += len(cleaned_data)
+        record["rows_rejected"] += rows_in - len(cleaned_data)
+        objects.append(obj)
+        if not cleaned_data.empty:
+            frames.append(cleaned_data)
+            rows += len(cleaned_data)
+        if rows >= BATCH_ROWS:
+            await flush()
+
+    await flush()
+    await load_queue.put(None)
+
+
+async def load_batches(load_queue: asyncio.Queue, record: dict) -> None:
+    """Load each cleaned batch and record its source objects, one transaction at a time."""
+    while (batch := await load_queue.get()) is not None:
+        cleaned_data, objects, skipped = batch
+        del batch
+        loaded_rows = await run_timed(record, "load_seconds", upload_transaction_frame,
+                                      cleaned_data, processed_objects=objects,
+                                      skipped_objects=skipped)
+        record["batches"] += 1
+        if loaded_rows is None:
+            record["batches_failed"] += 1
+        else:
+            record["rows_loaded"] += loaded_rows
+
+
+async def run_pipelined(s3_client, bucket: str, datetime_strs: list[str], record: dict) -> None:
+    """Run the given hours through overlapping extract, transform and load stages.
+
+    Counters and each stage's busy time are added to record. Files that are not
+    truck files or fail to parse are recorded in the manifest without loading
+    any rows. Batches that fail to load are left out of it, so the next run
+    retries them.
+    """
+    record.update(files=0, files_failed=0, bytes_downloaded=0, rows_in=0, rows_out=0,
+                  rows_rejected=0, rows_loaded=0, batches=0, batches_failed=0)
+    budget = MemoryBudget(MEMORY_BUDGET_BYTES)
+    raw_queue = asyncio.Queue(maxsize=RAW_QUEUE_SIZE)
+    load_queue = asyncio.Queue(maxsize=LOAD_QUEUE_SIZE)
+    try:
+        async with asyncio.TaskGroup() as group:
+            group.create_task(extract_files(s3_client, bucket, datetime_strs,
+                                            raw_queue, budget, record))
+            group.create_task(transform_files(raw_queue, load_queue, budget, record))
+            group.create_task(load_batches(load_queue, record))
+    finally:
+        record["peak_buffered_mb"] = round(budget.peak / 1024 ** 2, 1)
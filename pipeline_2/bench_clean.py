@@ -0,0 +1,70 @@
+"""Micro-benchmark the vectorised clean_data against the previous implementation.
+
+Usage: python bench_clean.py --rows 1000000 10000000
+
+Reports wall time and peak traced memory (tracemalloc) for each row count.
+"""
+import time
+import argparse
+import tracemalloc
+import numpy as np
+import pandas as pd
+from transform import clean_data, CARD_PAYMENT_ID, CASH_PAYMENT_ID
+
+
+def legacy_clean_data(df: pd.DataFrame) -> pd.DataFrame:
+    """The clean_data implementation this benchmark is measured against."""
+    df['total'] = pd.to_numeric(df['total'], errors='coerce')
+    df = df.dropna(subset=['total'])
+
+    df = df[(df['total'] > 0) & (df['total'] <= 100)]
+
+    df['total'] = df['total'].round(2).astype(
+        float).apply(lambda x: f"{x:.2f}")
+
+    df['type'] = df['type'].str.lower().replace(
+        {'card': CARD_PAYMENT_ID, 'cash': CASH_PAYMENT_ID})
+    df = df.rename(columns={'type': 'payment_method_id'})
+    df['payment_method_id'] = df['payment_method_id'].astype(int)
+    return df
+
+
+def make_raw_transactions(rows: int) -> pd.DataFrame:
+    """Build a raw hourly frame with the blank, VOID and out-of-range totals seen in S3."""
+    rng = np.random.default_rng(3)
+    totals = np.round(rng.uniform(-5, 120, rows), 2).astype(str).astype(object)
+    totals[rng.random(rows) < 0.02] = "VOID"
+    totals[rng.random(rows) < 0.02] = ""
+    return pd.DataFrame({
+        "timestamp": (pd.Timestamp("2024-11-05 12:00") + pd.to_timedelta(
+            rng.integers(0, 3600, rows), unit="s")).astype(str),
+        "type": rng.choice(["card", "Card", "cash", "CASH"], rows),
+        "total": totals,
+        "truck_id": rng.integers(1, 7, rows)
+    })
+
+
+def measure(clean, raw: pd.DataFrame) -> tuple[float, float, int]:
+    """Return (seconds, peak MiB, rows out) for cleaning a fresh copy of raw."""
+    df = raw.copy()
+    tracemalloc.start()
+    start = time.perf_counter()
+    cleaned = clean(df)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20, len(cleaned)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark clean_data.")
+    parser.add_argument("--rows", type=int, nargs="+",
+                        default=[1_000_000, 10_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'implementation':<12} {'seconds':>9} {'peak MiB':>10} {'kept':>12}")
+    for rows in args.rows:
+        raw = make_raw_transactions(rows)
+        for name, clean in (("legacy", legacy_clean_data), ("vectorised", clean_data)):
+            elapsed, peak, kept = measure(clean, raw)
+            print(f"{rows:>12,} {name:<12} {elapsed:>9.2f} {peak:>10.1f} {kept:>12,}")
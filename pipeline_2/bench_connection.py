@@ -0,0 +1,65 @@
+"""Measure the connection setup saved by reusing pooled connections.
+
+Usage: python bench_connection.py --runs 50 --dsn "dbname=postgres host=localhost sslmode=require"
+
+Simulates report invocations against a local Postgres stand-in: once opening
+a new connection per invocation, as the Lambda used to, and once borrowing
+from a ConnectionPool, as warm invocations now do.
+"""
+import time
+import argparse
+import psycopg2
+from t3_shared.connection import ConnectionPool
+
+INVOCATION_QUERY = "SELECT COUNT(*) FROM generate_series(1, 1000);"
+
+
+def run_invocation(conn) -> None:
+    """Stand in for one report invocation's database work."""
+    with conn.cursor() as cursor:
+        cursor.execute(INVOCATION_QUERY)
+        cursor.fetchone()
+
+
+def time_fresh_connections(dsn: str, runs: int) -> float:
+    """Open, use and close a new connection per invocation."""
+    start = time.perf_counter()
+    for _ in range(runs):
+        conn = psycopg2.connect(dsn=dsn)
+        conn.autocommit = True
+        run_invocation(conn)
+        conn.close()
+    return time.perf_counter() - start
+
+
+def time_pooled_connections(dsn: str, runs: int) -> tuple[float, dict]:
+    """Borrow a pooled connection per invocation, health-checking it on reuse."""
+    def connect():
+        conn = psycopg2.connect(dsn=dsn)
+        conn.autocommit = True
+        return conn
+
+    pool = ConnectionPool(connect, max_size=1)
+    start = time.perf_counter()
+    for _ in range(runs):
+        with pool.connection() as conn:
+            run_invocation(conn)
+    elapsed = time.perf_counter() - start
+    stats = pool.stats()
+    pool.close()
+    return elapsed, stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark connection reuse.")
+    parser.add_argument("--dsn", default="dbname=postgres host=localhost")
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    fresh_time = time_fresh_connections(args.dsn, args.runs)
+    pooled_time, pool_stats = time_pooled_connections(args.dsn, args.runs)
+
+    print(f"fresh   {fresh_time / args.runs * 1000:>8.2f} ms/invocation")
+    print(f"pooled  {pooled_time / args.runs * 1000:>8.2f} ms/invocation "
+          f"({pool_stats['connects']} connects, {pool_stats['reuses']} reuses)")
+    print(f"saved   {(fresh_time - pooled_time) / args.runs * 1000:>8.2f} ms/invocation")
@@ -0,0 +1,90 @@
+"""Report the memory saved by the compact transaction dtypes on a representative dataset.
+
+Usage: python bench_dtypes.py --rows 5000000
+
+Each variant is loaded in a fresh process so its peak RSS is measured in isolation.
+The peak is read from VmHWM rather than ru_maxrss, which Linux carries across
+exec from the parent that wrote the dataset. It is reported as growth over the
+RSS after imports, so the cost of importing pandas and pyarrow does not hide
+the difference on small datasets.
+"""
+import os
+import time
+import argparse
+import resource
+import tempfile
+import multiprocessing
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from t3_shared.transaction_schema import cast_transactions
+
+DEFAULT_DTYPES = {"truck_id": "int64", "payment_method_id": "int64",
+                  "total": "float64", "source_key": "object"}
+
+
+def write_dataset(path: str, rows: int) -> None:
+    """Write a month of hourly transactions shaped like FACT_Transaction."""
+    rng = np.random.default_rng(11)
+    hours = pd.date_range("2024-11-01", periods=30 * 24, freq="h")
+    hour_index = rng.integers(0, len(hours), rows)
+    truck_id = rng.integers(1, 7, rows)
+    pd.DataFrame({
+        "truck_id": truck_id,
+        "payment_method_id": rng.integers(1, 3, rows),
+        "total": rng.integers(100, 10000, rows),
+        "timestamp": hours[hour_index] + pd.to_timedelta(rng.integers(0, 3600, rows), unit="s"),
+        "source_key": [f"trucks/2024-11/{hours[h].day}/{hours[h].hour}/T3_T{t}_000.csv"
+                       for h, t in zip(hour_index, truck_id)]
+    }).to_parquet(path, index=False)
+
+
+def get_peak_rss_mib() -> float:
+    """Return the process's peak resident set size so far, in MiB."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load_variant(path: str, compact: bool, results) -> None:
+    """Load the dataset in batches with either default or compact dtypes."""
+    baseline_rss_mib = get_peak_rss_mib()
+    start = time.perf_counter()
+    chunks = []
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=100_000):
+        chunk = batch.to_pandas()
+        chunks.append(cast_transactions(chunk) if compact else chunk.astype(DEFAULT_DTYPES))
+    df = pd.concat(chunks, ignore_index=True)
+    if compact:
+        df = cast_transactions(df)
+    results.put({
+        "frame_mib": df.memory_usage(deep=True).sum() / 2 ** 20,
+        "peak_rss_mib": get_peak_rss_mib() - baseline_rss_mib,
+        "seconds": time.perf_counter() - start
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure compact dtype savings.")
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        dataset = os.path.join(directory, "transactions.parquet")
+        write_dataset(dataset, args.rows)
+
+        print(f"{'dtypes':<10} {'frame MiB':>10} {'peak RSS +MiB':>14} {'seconds':>8}")
+        for name, compact in (("default", False), ("compact", True)):
+            queue = context.Queue()
+            process = context.Process(target=load_variant, args=(dataset, compact, queue))
+            process.start()
+            result = queue.get()
+            process.join()
+            print(f"{name:<10} {result['frame_mib']:>10.1f} "
+                  f"{result['peak_rss_mib']:>14.1f} {result['seconds']:>8.2f}")
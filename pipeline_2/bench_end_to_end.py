@@ -0,0 +1,189 @@
+"""Run both ETL pipelines end to end against a local S3 stand-in and Postgres.
+
+Usage: python bench_end_to_end.py --dsn "dbname=postgres host=localhost user=postgres"
+                                  --days 30 --transactions-per-hour 500
+
+Starts a moto server, fills a bucket with generate_truck_data files, creates
+the warehouse tables in a scratch schema and runs etl_pipeline.py and
+etl_pipeline2.py unchanged as subprocesses, pointed at the stand-ins through
+AWS_ENDPOINT_URL_S3 and DB_DRIVER=postgres. Each run's JSON summary is then
+reported as latency and throughput per stage, so performance changes can be
+compared on the same generated data. --pipelines backfill runs the
+checkpointed historical backfill instead of, or after, the all-at-once load.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+import boto3
+import psycopg2
+from psycopg2.extensions import parse_dsn
+from moto.server import ThreadedMotoServer
+from generate_truck_data import generate_files, upload_to_bucket
+
+BENCH_BUCKET = "bench-trucks"
+BENCH_SCHEMA = "bench_end_to_end"
+HERE = os.path.dirname(os.path.abspath(__file__))
+PIPELINE_SCRIPTS = {
+    "pipeline": os.path.join(HERE, "..", "pipeline", "etl_pipeline.py"),
+    "pipeline_2": os.path.join(HERE, "etl_pipeline2.py"),
+    "backfill": os.path.join(HERE, "..", "pipeline", "backfill.py")
+}
+THROUGHPUT_COUNTERS = {"extract": "files", "transform": "rows_in", "load": "rows_loaded",
+                       "pipelined": "rows_loaded"}
+
+
+def create_tables(cursor) -> None:
+    """Create the tables the pipelines write to, indexed the way Redshift is sorted."""
+    cursor.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE;")
+    cursor.execute(f"CREATE SCHEMA {BENCH_SCHEMA};")
+    cursor.execute(f"SET search_path TO {BENCH_SCHEMA};")
+    cursor.execute("""
+        CREATE TABLE FACT_Transaction (
+            transaction_id BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+            truck_id SMALLINT, payment_method_id SMALLINT, total INT,
+            at TIMESTAMP NOT NULL, source_key VARCHAR(512));
+        CREATE INDEX ON FACT_Transaction (at);
+        CREATE INDEX ON FACT_Transaction (source_key);
+        CREATE TABLE ETL_Processed_Object (object_key VARCHAR(512) PRIMARY KEY,
+            etag VARCHAR(64) NOT NULL, size BIGINT NOT NULL, processed_at TIMESTAMP NOT NULL,
+            first_at TIMESTAMP, last_at TIMESTAMP);
+        CREATE TABLE ETL_Backfill_Partition (truck_id SMALLINT NOT NULL, month CHAR(7) NOT NULL,
+            rows_loaded INT NOT NULL, completed_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (truck_id, month));
+        CREATE TABLE AGG_Hourly_Truck_Summary (day DATE NOT NULL, hour SMALLINT NOT NULL,
+            truck_id SMALLINT NOT NULL, payment_method_id SMALLINT NOT NULL,
+            transaction_count INT NOT NULL, total_revenue BIGINT NOT NULL,
+            PRIMARY KEY (day, hour, truck_id, payment_method_id));
+        CREATE TABLE AGG_Daily_Truck_Summary (day DATE NOT NULL, truck_id SMALLINT NOT NULL,
+            payment_method_id SMALLINT NOT NULL, transaction_count INT NOT NULL,
+            total_revenue BIGINT NOT NULL, PRIMARY KEY (day, truck_id, payment_method_id));
+    """)
+
+
+def get_pipeline_env(dsn: str, endpoint_url: str, work_dir: str, pipeline_mode: str) -> dict:
+    """Environment pointing a pipeline at the stand-in bucket and database."""
+    params = parse_dsn(dsn)
+    env = {key: value for key, value in os.environ.items()
+           if key not in ("COPY_STAGING_BUCKET", "COPY_IAM_ROLE", "REPORT_CACHE_BUCKET")}
+    env.update({
+        "AWS_ENDPOINT_URL_S3": endpoint_url,
+        "AWS_DEFAULT_REGION": "us-east-1",
+        "ACCESS_KEY_ID": "bench",
+        "SECRET_ACCESS_KEY": "bench",
+        "BUCKET": BENCH_BUCKET,
+        "DB_DRIVER": "postgres",
+        "HOST": params.get("host", "localhost"),
+        "PORT": params.get("port", "5432"),
+        "USERNAME": params.get("user", os.getenv("USER", "postgres")),
+        "PASSWORD": params.get("password", ""),
+        "DATABASE_NAME": params.get("dbname", "postgres"),
+        "SCHEMA": BENCH_SCHEMA,
+        "PIPELINE_MODE": pipeline_mode,
+        "REPORT_CACHE_DIR": os.path.join(work_dir, "report_data"),
+        "PYTHONPATH": os.path.join(HERE, "..", "shared")
+    })
+    return env
+
+
+def run_pipeline(name: str, env: dict, work_dir: str, verbose: bool) -> dict:
+    """Run one pipeline script in its own working directory and return its run summary."""
+    pipeline_dir = os.path.join(work_dir, name)
+    os.makedirs(pipeline_dir)
+    summary_file = os.path.join(pipeline_dir, "summary.json")
+    result = subprocess.run(
+        [sys.executable, PIPELINE_SCRIPTS[name]], cwd=pipeline_dir,
+        env={**env, "PIPELINE_SUMMARY_FILE": summary_file},
+        capture_output=not verbose, text=True, check=False)
+    if result.returncode or not os.path.exists(summary_file):
+        raise RuntimeError(f"{name} exited with {result.returncode}:\n{result.stderr or ''}")
+    with open(summary_file, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def summarise_stages(summary: dict) -> dict[str, dict]:
+    """Combine a run's stage records by stage name, summing counters and seconds."""
+    stages = {}
+    for record in summary["stages"]:
+        stage = stages.setdefault(record["stage"], {"runs": 0, "peak_rss_mb": 0, "errors": []})
+        stage["runs"] += 1
+        stage["peak_rss_mb"] = max(stage["peak_rss_mb"], record["peak_rss_mb"])
+        if "error" in record:
+            stage["errors"].append(record["error"])
+        for key, value in record.items():
+            if isinstance(value, (int, float)) and key != "peak_rss_mb":
+                stage[key] = stage.get(key, 0) + value
+    return stages
+
+
+def print_report(name: str, summary: dict) -> None:
+    """Print latency and throughput for each stage of a run summary."""
+    print(f"{name}: {summary['seconds']:.2f}s, peak {summary['peak_rss_mb']:.0f} MiB")
+    for stage_name, stage in summarise_stages(summary).items():
+        seconds = stage["seconds"]
+        counter = THROUGHPUT_COUNTERS.get(stage_name)
+        throughput = ""
+        if counter:
+            count = stage.get(counter, 0)
+            throughput = f"  {count:>10,} {counter:<11}"
+            if seconds:
+                throughput += f"{count / seconds:>12,.0f} {counter}/s"
+        if stage_name == "extract" and seconds:
+            throughput += f"  {stage.get('bytes_downloaded', 0) / 1024 ** 2 / seconds:>7.1f} MiB/s"
+        print(f"  {stage_name:<10} {stage['runs']:>3} runs  {seconds:>8.3f}s total"
+              f"  {seconds / stage['runs']:>8.3f}s mean{throughput}"
+              f"  peak {stage['peak_rss_mb']:>6.0f} MiB")
+        if "load_seconds" in stage:
+            print(f"{'':>13}busy: extract {stage.get('extract_seconds', 0):.3f}s, transform "
+                  f"{stage.get('transform_seconds', 0):.3f}s, load {stage['load_seconds']:.3f}s")
+        if "rows_rejected" in stage:
+            print(f"{'':>13}{stage['rows_rejected']:,} rows rejected by cleaning")
+        for error in stage["errors"]:
+            print(f"{'':>13}error: {error}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark both ETL pipelines against local S3 and Postgres stand-ins.")
+    parser.add_argument("--dsn", default="dbname=postgres host=localhost")
+    parser.add_argument("--pipelines", nargs="+", choices=list(PIPELINE_SCRIPTS),
+                        default=["pipeline", "pipeline_2"])
+    parser.add_argument("--trucks", type=int, default=6)
+    parser.add_argument("--days", type=int, default=30, help="Days of historical data.")
+    parser.add_argument("--transactions-per-hour", type=int, default=40,
+                        help="Transactions per truck per hour.")
+    parser.add_argument("--dirty-rate", type=float, default=0.05)
+    parser.add_argument("--pipeline-mode", choices=["sequential", "async"], default="sequential",
+                        help="PIPELINE_MODE for etl_pipeline2.py.")
+    parser.add_argument("--port", type=int, default=5056)
+    parser.add_argument("--verbose", action="store_true", help="Show the pipelines' logs.")
+    args = parser.parse_args()
+
+    server = ThreadedMotoServer(port=args.port, verbose=False)
+    server.start()
+    conn = psycopg2.connect(dsn=args.dsn)
+    conn.autocommit = True
+    try:
+        endpoint_url = f"http://127.0.0.1:{args.port}"
+        s3_client = boto3.client("s3", endpoint_url=endpoint_url, region_name="us-east-1",
+                                 aws_access_key_id="bench", aws_secret_access_key="bench")
+        s3_client.create_bucket(Bucket=BENCH_BUCKET)
+        uploaded = upload_to_bucket(s3_client, BENCH_BUCKET, generate_files(
+            args.trucks, args.days, 3, args.transactions_per_hour, args.dirty_rate))
+        print(f"Seeded {uploaded / 1024 ** 2:.1f} MiB of truck data.")
+
+        with conn.cursor() as cursor:
+            create_tables(cursor)
+            with tempfile.TemporaryDirectory() as work_dir:
+                env = get_pipeline_env(args.dsn, endpoint_url, work_dir, args.pipeline_mode)
+                for name in args.pipelines:
+                    print_report(name, run_pipeline(name, env, work_dir, args.verbose))
+
+            cursor.execute("SELECT COUNT(*) FROM FACT_Transaction;")
+            print(f"FACT_Transaction holds {cursor.fetchone()[0]:,} rows.")
+            cursor.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE;")
+    finally:
+        conn.close()
+        server.stop()
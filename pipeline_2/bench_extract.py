@@ -0,0 +1,79 @@
+"""Benchmark serial vs concurrent S3 downloads against a local moto server.
+
+Usage: python bench_extract.py --files 48 --latency-ms 50 --workers 8
+
+Every request to the stand-in is delayed by --latency-ms to mimic the round
+trip to the real bucket, which is what the worker pool is hiding.
+"""
+import time
+import shutil
+import argparse
+import tempfile
+import boto3
+from botocore.config import Config
+from moto.server import ThreadedMotoServer
+from extract import download_files
+
+BENCH_BUCKET = "bench-trucks"
+SAMPLE_CSV = b"timestamp,type,total\n" + b"2024-11-05 12:00:00,card,12.50\n" * 200
+
+
+def create_client(endpoint_url: str, workers: int, latency: float):
+    """Create an S3 client for the stand-in that sleeps before every request."""
+    s3_client = boto3.client(
+        "s3", endpoint_url=endpoint_url, region_name="us-east-1",
+        aws_access_key_id="bench", aws_secret_access_key="bench",
+        config=Config(max_pool_connections=max(workers, 10)))
+    s3_client.meta.events.register(
+        "before-send.s3.*", lambda **_: time.sleep(latency))
+    return s3_client
+
+
+def seed_bucket(s3_client, files: int) -> list[str]:
+    """Upload synthetic truck CSVs and return their keys."""
+    s3_client.create_bucket(Bucket=BENCH_BUCKET)
+    keys = [f"trucks/2024-11/5/12/T3_T{i % 6 + 1}_{i}.csv" for i in range(files)]
+    for key in keys:
+        s3_client.put_object(Bucket=BENCH_BUCKET, Key=key, Body=SAMPLE_CSV)
+    return keys
+
+
+def time_download(s3_client, keys: list[str], workers: int) -> float:
+    """Download every key into a scratch directory and return the elapsed time."""
+    download_dir = tempfile.mkdtemp()
+    try:
+        start = time.perf_counter()
+        paths = download_files(s3_client, BENCH_BUCKET, keys,
+                               download_dir, max_workers=workers)
+        elapsed = time.perf_counter() - start
+        assert len(paths) == len(keys), "Not every file was downloaded."
+        return elapsed
+    finally:
+        shutil.rmtree(download_dir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark concurrent S3 downloads.")
+    parser.add_argument("--files", type=int, default=48)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--port", type=int, default=5055)
+    args = parser.parse_args()
+
+    server = ThreadedMotoServer(port=args.port, verbose=False)
+    server.start()
+    try:
+        s3_client = create_client(f"http://127.0.0.1:{args.port}",
+                                  args.workers, args.latency_ms / 1000)
+        keys = seed_bucket(s3_client, args.files)
+
+        serial = time_download(s3_client, keys, workers=1)
+        concurrent = time_download(s3_client, keys, workers=args.workers)
+
+        print(f"serial      {serial:>7.2f}s {args.files / serial:>8.1f} files/s")
+        print(f"{args.workers} workers   {concurrent:>7.2f}s "
+              f"{args.files / concurrent:>8.1f} files/s")
+        print(f"speedup     {serial / concurrent:>7.1f}x")
+    finally:
+        server.stop()
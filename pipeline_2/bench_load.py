@@ -0,0 +1,114 @@
+"""Benchmark FACT_Transaction load strategies against a local Postgres stand-in.
+
+Usage: python bench_load.py --rows 100000 --dsn "dbname=postgres host=localhost"
+
+Redshift cannot COPY from a client stream, so the COPY strategy is emulated
+with Postgres' COPY FROM STDIN over the same gzip CSV that is staged in S3.
+"""
+import io
+import gzip
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import psycopg2
+from load import (TRANSACTION_COLUMNS, get_transaction_rows,
+                  insert_transactions_batched, stage_transactions_csv)
+
+BENCH_SCHEMA = "bench_load"
+
+
+def make_transactions(rows: int) -> pd.DataFrame:
+    """Build a synthetic batch of cleaned transactions."""
+    rng = np.random.default_rng(42)
+    return pd.DataFrame({
+        "truck_id": rng.integers(1, 7, rows),
+        "payment_method_id": rng.integers(1, 3, rows),
+        "total": rng.integers(100, 10000, rows),
+        "timestamp": pd.Timestamp("2024-11-01") + pd.to_timedelta(
+            rng.integers(0, 30 * 24 * 3600, rows), unit="s"),
+        "source_key": "trucks/2024-11/1/12/T3_T1_bench.csv"
+    })[TRANSACTION_COLUMNS]
+
+
+def reset_table(cursor) -> None:
+    """Recreate an empty FACT_Transaction in the benchmark schema."""
+    cursor.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE;")
+    cursor.execute(f"CREATE SCHEMA {BENCH_SCHEMA};")
+    cursor.execute(f"SET search_path TO {BENCH_SCHEMA};")
+    cursor.execute("""
+        CREATE TABLE FACT_Transaction (
+            transaction_id BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+            truck_id SMALLINT,
+            payment_method_id SMALLINT,
+            total INT,
+            at TIMESTAMP NOT NULL,
+            source_key VARCHAR(512)
+        );
+    """)
+
+
+def load_row_by_row(cursor, df: pd.DataFrame) -> None:
+    """The original strategy: one INSERT per transaction."""
+    for row in get_transaction_rows(df):
+        cursor.execute("""
+            INSERT INTO FACT_Transaction (truck_id, payment_method_id, total, at, source_key)
+            VALUES (%s, %s, %s, %s, %s);
+        """, row)
+
+
+def load_batched(cursor, df: pd.DataFrame, chunk_size: int) -> None:
+    """Multi-row VALUES statements."""
+    insert_transactions_batched(cursor, get_transaction_rows(df), chunk_size)
+
+
+def load_copy(cursor, df: pd.DataFrame) -> None:
+    """A single COPY of the staged gzip CSV."""
+    staged = io.BytesIO(gzip.decompress(stage_transactions_csv(df)))
+    cursor.copy_expert(
+        "COPY FACT_Transaction (truck_id, payment_method_id, total, at, source_key) "
+        "FROM STDIN WITH (FORMAT csv, HEADER true);", staged)
+
+
+def run_benchmark(dsn: str, rows: int, chunk_size: int) -> None:
+    """Time each strategy inside its own transaction and print rows/second."""
+    df = make_transactions(rows)
+    strategies = {
+        "row-by-row": lambda cursor: load_row_by_row(cursor, df),
+        f"batched (chunk={chunk_size})": lambda cursor: load_batched(cursor, df, chunk_size),
+        "copy": lambda cursor: load_copy(cursor, df)
+    }
+    conn = psycopg2.connect(dsn)
+    try:
+        for name, strategy in strategies.items():
+            with conn.cursor() as cursor:
+                reset_table(cursor)
+                conn.commit()
+
+                start = time.perf_counter()
+                strategy(cursor)
+                conn.commit()
+                elapsed = time.perf_counter() - start
+
+                cursor.execute("SELECT COUNT(*) FROM FACT_Transaction;")
+                loaded = cursor.fetchone()[0]
+            print(f"{name:<24} {loaded:>10} rows {elapsed:>8.2f}s "
+                  f"{loaded / elapsed:>12,.0f} rows/s")
+
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE;")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark FACT_Transaction load strategies.")
+    parser.add_argument("--dsn", default="dbname=postgres host=localhost",
+                        help="libpq connection string for the Postgres stand-in")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    run_benchmark(args.dsn, args.rows, args.chunk_size)
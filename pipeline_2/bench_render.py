@@ -0,0 +1,102 @@
+"""Compare the template-based report renderer with the original f-string version.
+
+Usage: python bench_render.py --rows 1000 10000
+
+Builds report data with the given number of table rows per section and times
+the f-string renderer, the compiled template rendered to a string, and the
+template streamed to a file. The one-off template compile is timed separately.
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from report_generator import (build_report_data, generate_html_report, get_template,
+                              iter_html_report, save_to_file)
+
+REPORT_DAY = "2024-11-05"
+
+
+def legacy_generate_html_report(data: dict, previous_day: str) -> str:
+    """The generate_html_report implementation this benchmark is measured against."""
+    html_content = f"""
+    <html>
+    <head>
+        <title>Daily Truck Transactions Report for {previous_day}</title>
+    </head>
+    <body>
+        <h2>Daily Truck Transactions Report for {previous_day}</h2>
+        <p><strong>Total Transaction Value across all trucks:</strong> £{data["total_transaction_value_all_trucks"]:.2f}</p>
+        <p><strong>Average Total Transaction Value:</strong> £{data["average_total_transaction_value"]:.2f}</p>
+
+        <h3>Truck Data Summary</h3>
+        <table>
+            <tr><th>Truck ID</th><th>Total Revenue (£)</th><th>Average Transaction Value (£)</th><th>Transaction Count</th></tr>
+            {"".join(f"<tr><td>{truck_id}</td><td>{total_revenue:.2f}</td><td>{average_transaction_value:.2f}</td><td>{transaction_count}</td></tr>" for truck_id, total_revenue, average_transaction_value, transaction_count in data["truck_data_summary"])}
+        </table>
+
+        <h3>Transaction Count per Truck</h3>
+        <table>
+            <tr><th>Truck ID</th><th>Transaction Count</th></tr>
+            {"".join(f"<tr><td>{truck_id}</td><td>{transaction_count}</td></tr>" for truck_id, transaction_count in data["transaction_count_per_truck"])}
+        </table>
+
+        <h3>Average Transaction Value per Truck</h3>
+        <table>
+            <tr><th>Truck ID</th><th>Average Transaction Value (£)</th></tr>
+            {"".join(f"<tr><td>{truck_id}</td><td>{average_transaction_value:.2f}</td></tr>" for truck_id,
+                     average_transaction_value in data["average_transaction_value_per_truck"])}
+        </table>
+    </body>
+    </html>
+    """
+    return html_content
+
+
+def make_report_data(rows: int) -> dict:
+    """Build report data with one table row per truck in every section."""
+    rng = random.Random(11)
+    truck_totals = []
+    for truck_id in range(1, rows + 1):
+        count = rng.randint(1, 500)
+        truck_totals.append((truck_id, count * rng.randint(300, 1500), count))
+    return build_report_data(truck_totals)
+
+
+def measure(render) -> tuple[float, int]:
+    """Return a renderer's elapsed time and, from a second traced run, its peak memory."""
+    start = time.perf_counter()
+    render()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    render()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark report rendering.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000])
+    args = parser.parse_args()
+
+    compile_start = time.perf_counter()
+    get_template("report.html")
+    print(f"template compile (once per process) {(time.perf_counter() - compile_start) * 1000:.1f} ms")
+
+    with tempfile.TemporaryDirectory() as folder:
+        for rows in args.rows:
+            data = make_report_data(rows)
+            renderers = {
+                "f-string": lambda: legacy_generate_html_report(data, REPORT_DAY),
+                "template": lambda: generate_html_report(data, REPORT_DAY),
+                "streamed": lambda: save_to_file(iter_html_report(data, REPORT_DAY),
+                                                 folder, "report.html")
+            }
+            for name, render in renderers.items():
+                elapsed, peak = measure(render)
+                print(f"{rows:>9,} rows  {name:<9} {elapsed * 1000:>9.1f} ms  "
+                      f"peak {peak / 1024 ** 2:>7.1f} MiB")
+            print(f"{'':>15}file size {os.path.getsize(os.path.join(folder, 'report.html')) / 1024:.0f} KiB")
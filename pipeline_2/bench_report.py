@@ -0,0 +1,172 @@
+"""Compare the single-query report engine with the original five-query version.
+
+Usage: python bench_report.py --rows 200000 --dsn "dbname=postgres host=localhost"
+
+Seeds a local Postgres stand-in with a day of transactions and its rollups,
+then checks both versions return the same report and counts their queries.
+"""
+import math
+import time
+import argparse
+from datetime import date, timedelta
+import numpy as np
+import psycopg2
+from t3_shared.rollups import refresh_rollups
+from report_generator import gather_report_data
+
+BENCH_SCHEMA = "bench_report"
+REPORT_DAY = date(2024, 11, 5)
+
+# The original report's queries, verbatim. Their money values are in pence
+# now that FACT_Transaction.total is stored in pence.
+LEGACY_QUERIES = {
+    "total_transaction_value_all_trucks": """
+        SELECT SUM(total) AS total_transaction_value_all_trucks
+        FROM FACT_Transaction
+        WHERE DATE(at) = %s
+    """,
+    "truck_data_summary": """
+        SELECT truck_id, SUM(total) AS total_revenue, AVG(total) AS average_transaction_value,
+               COUNT(*) AS transaction_count
+        FROM FACT_Transaction
+        WHERE DATE(at) = %s
+        GROUP BY truck_id
+        ORDER BY total_revenue DESC
+    """,
+    "transaction_count_per_truck": """
+        SELECT truck_id, COUNT(*) AS transaction_count
+        FROM FACT_Transaction
+        WHERE DATE(at) = %s
+        GROUP BY truck_id
+        ORDER BY transaction_count DESC
+    """,
+    "average_transaction_value_per_truck": """
+        SELECT truck_id, AVG(total) AS average_transaction_value
+        FROM FACT_Transaction
+        WHERE DATE(at) = %s
+        GROUP BY truck_id
+        ORDER BY average_transaction_value DESC
+    """,
+    "average_total_transaction_value": """
+        SELECT AVG(total) AS average_total_transaction_value
+        FROM FACT_Transaction
+        WHERE DATE(at) = %s
+    """
+}
+# Columns of each legacy section holding pence, converted before comparing.
+LEGACY_PENCE_COLUMNS = {"truck_data_summary": (1, 2), "average_transaction_value_per_truck": (1,)}
+
+
+class CountingCursor:
+    """Wraps a DB-API cursor and counts the statements it executes."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.queries = 0
+
+    def execute(self, query, params=None):
+        """Execute and count a statement."""
+        self.queries += 1
+        return self.cursor.execute(query, params)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+def seed_database(cursor, rows: int) -> None:
+    """Create the tables and load a day of transactions either side of REPORT_DAY."""
+    cursor.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE;")
+    cursor.execute(f"CREATE SCHEMA {BENCH_SCHEMA};")
+    cursor.execute(f"SET search_path TO {BENCH_SCHEMA};")
+    cursor.execute("""
+        CREATE TABLE FACT_Transaction (truck_id SMALLINT, payment_method_id SMALLINT,
+                                       total INT, at TIMESTAMP NOT NULL);
+        CREATE TABLE AGG_Hourly_Truck_Summary (day DATE, hour SMALLINT, truck_id SMALLINT,
+            payment_method_id SMALLINT, transaction_count INT, total_revenue BIGINT);
+        CREATE TABLE AGG_Daily_Truck_Summary (day DATE, truck_id SMALLINT,
+            payment_method_id SMALLINT, transaction_count INT, total_revenue BIGINT);
+    """)
+    rng = np.random.default_rng(5)
+    start = np.datetime64(REPORT_DAY - timedelta(days=1))
+    cursor.execute("""
+        INSERT INTO FACT_Transaction (truck_id, payment_method_id, total, at)
+        SELECT * FROM UNNEST(%s::SMALLINT[], %s::SMALLINT[], %s::INT[], %s::TIMESTAMP[])
+    """, (rng.integers(1, 7, rows).tolist(), rng.integers(1, 3, rows).tolist(),
+          rng.integers(100, 10000, rows).tolist(),
+          (start + rng.integers(0, 3 * 24 * 3600, rows).astype("timedelta64[s]"))
+          .astype(str).tolist()))
+    refresh_rollups(cursor, [(REPORT_DAY - timedelta(days=1), REPORT_DAY + timedelta(days=1))])
+
+
+def gather_legacy_report_data(cursor, previous_day: str) -> dict:
+    """The original report: one full scan of FACT_Transaction per section."""
+    report = {}
+    for section, query in LEGACY_QUERIES.items():
+        cursor.execute(query, (previous_day,))
+        rows = cursor.fetchall()
+        report[section] = rows[0][0] if section.startswith(("total", "average_total")) else rows
+    return report
+
+
+def convert_legacy_report(report: dict) -> dict:
+    """Convert the legacy report's pence values to pounds, as the current report returns."""
+    converted = {}
+    for section, value in report.items():
+        if section.startswith(("total", "average_total")):
+            converted[section] = float(value) / 100
+        elif section in LEGACY_PENCE_COLUMNS:
+            converted[section] = [
+                tuple(float(item) / 100 if index in LEGACY_PENCE_COLUMNS[section] else item
+                      for index, item in enumerate(row))
+                for row in value]
+        else:
+            converted[section] = value
+    return converted
+
+
+def assert_reports_match(expected, actual) -> None:
+    """Check two report values are equal, allowing for floating point rounding."""
+    if isinstance(expected, (list, tuple)):
+        assert len(expected) == len(actual), (expected, actual)
+        for expected_item, actual_item in zip(expected, actual):
+            assert_reports_match(expected_item, actual_item)
+    elif isinstance(expected, float):
+        assert math.isclose(expected, actual, rel_tol=1e-9), (expected, actual)
+    else:
+        assert expected == actual, (expected, actual)
+
+
+def time_report(cursor, gather) -> tuple[dict, float]:
+    """Run a report function and return its output and elapsed time."""
+    start = time.perf_counter()
+    report = gather(cursor, REPORT_DAY.isoformat())
+    return report, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the report engines.")
+    parser.add_argument("--dsn", default="dbname=postgres host=localhost")
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(dsn=args.dsn)
+    try:
+        with conn.cursor() as raw_cursor:
+            seed_database(raw_cursor, args.rows)
+            conn.commit()
+
+            legacy_cursor, cursor = CountingCursor(raw_cursor), CountingCursor(raw_cursor)
+            legacy, legacy_time = time_report(legacy_cursor, gather_legacy_report_data)
+            report, report_time = time_report(cursor, gather_report_data)
+
+            for section, expected in convert_legacy_report(legacy).items():
+                assert_reports_match(expected, report[section])
+
+            print("Reports match.")
+            print(f"five-query  {legacy_cursor.queries} queries {legacy_time * 1000:>9.1f} ms")
+            print(f"single      {cursor.queries} queries {report_time * 1000:>9.1f} ms")
+
+            raw_cursor.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE;")
+            conn.commit()
+    finally:
+        conn.close()
@@ -0,0 +1,126 @@
+"""Check that the pipeline's queries filter FACT_Transaction with range-scannable predicates.
+
+Usage: python check_query_plans.py [--dsn "dbname=postgres host=localhost"]
+
+Runs the report, rollup, reload and manifest statements through a cursor that
+EXPLAINs each one first, then fails if any plan filters on a function of
+`at` (DATE(at), at::date, DATE_TRUNC(..., at)), which stops Redshift pruning
+blocks by the at sort key. Without --dsn the check runs against Redshift in a
+transaction that is rolled back; with --dsn it seeds a local Postgres stand-in
+with an index on at in place of the sort key.
+"""
+import re
+import sys
+import argparse
+from datetime import date, datetime, time, timedelta
+from t3_shared.connection import get_redshift_connection
+from load import delete_transactions_for_sources
+from manifest import get_loaded_time_ranges, get_processed_objects
+from t3_shared.rollups import refresh_rollups
+from report_generator import get_truck_totals
+
+CHECK_SCHEMA = "check_query_plans"
+CHECK_DAY = date(2024, 11, 5)
+PREDICATE_LINE = re.compile(r"(Filter|Cond):", re.IGNORECASE)
+WRAPPED_AT = re.compile(
+    r"\b(date|trunc|date_trunc|to_char|extract)\s*\([^)]*\"?\bat\b\"?"
+    r"|\(?\"?\bat\"?\)?\s*::\s*date",
+    re.IGNORECASE)
+
+
+class ExplainingCursor:
+    """Wraps a DB-API cursor and records the plan of every statement before running it."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.plans = []
+
+    def execute(self, query, params=None):
+        """EXPLAIN then execute a statement."""
+        if not query.lstrip().upper().startswith("SET"):
+            self.cursor.execute(f"EXPLAIN {query}", params)
+            self.plans.append(
+                (query, [row[0] for row in self.cursor.fetchall()]))
+        return self.cursor.execute(query, params)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+def seed_database(cursor) -> None:
+    """Create the tables the checked statements touch, indexed the way Redshift is sorted."""
+    cursor.execute(f"DROP SCHEMA IF EXISTS {CHECK_SCHEMA} CASCADE;")
+    cursor.execute(f"CREATE SCHEMA {CHECK_SCHEMA};")
+    cursor.execute(f"SET search_path TO {CHECK_SCHEMA};")
+    cursor.execute("""
+        CREATE TABLE FACT_Transaction (truck_id SMALLINT, payment_method_id SMALLINT,
+                                       total INT, at TIMESTAMP NOT NULL,
+                                       source_key VARCHAR(512));
+        CREATE INDEX ON FACT_Transaction (at);
+        CREATE TABLE AGG_Hourly_Truck_Summary (day DATE, hour SMALLINT, truck_id SMALLINT,
+            payment_method_id SMALLINT, transaction_count INT, total_revenue BIGINT);
+        CREATE INDEX ON AGG_Hourly_Truck_Summary (day);
+        CREATE TABLE AGG_Daily_Truck_Summary (day DATE, truck_id SMALLINT,
+            payment_method_id SMALLINT, transaction_count INT, total_revenue BIGINT);
+        CREATE INDEX ON AGG_Daily_Truck_Summary (day);
+        CREATE TABLE ETL_Processed_Object (object_key VARCHAR(512) PRIMARY KEY,
+            etag VARCHAR(64) NOT NULL, size BIGINT NOT NULL, processed_at TIMESTAMP NOT NULL,
+            first_at TIMESTAMP, last_at TIMESTAMP);
+    """)
+
+
+def run_checked_statements(cursor) -> None:
+    """Issue each statement the ETL and report send to FACT_Transaction and the rollups."""
+    source_keys = [f"trucks/{CHECK_DAY:%Y-%m/%d}/14/T3_1.csv"]
+    get_truck_totals(cursor, CHECK_DAY.isoformat())
+    get_loaded_time_ranges(cursor, source_keys)
+    delete_transactions_for_sources(cursor, {key: (datetime.combine(CHECK_DAY, time(14)),
+                                                   datetime.combine(CHECK_DAY, time(14, 59)))
+                                             for key in source_keys})
+    refresh_rollups(cursor, [(CHECK_DAY - timedelta(days=1), CHECK_DAY)])
+    get_processed_objects(cursor, f"trucks/{CHECK_DAY:%Y-%m/%d}/")
+
+
+def find_wrapped_predicates(plans: list[tuple[str, list[str]]]) -> list[tuple[str, str]]:
+    """Return (statement, plan line) for every filter that applies a function to at."""
+    return [(query, line) for query, lines in plans for line in lines
+            if PREDICATE_LINE.search(line) and WRAPPED_AT.search(line)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check query plans for non-sargable at predicates.")
+    parser.add_argument("--dsn", help="Local Postgres stand-in; Redshift if omitted.")
+    parser.add_argument("--verbose", action="store_true", help="Print every plan.")
+    args = parser.parse_args()
+
+    if args.dsn:
+        import psycopg2
+        conn = psycopg2.connect(dsn=args.dsn)
+    else:
+        conn = get_redshift_connection()
+    # The checked statements include DELETEs and rollup rebuilds; keep them in
+    # one transaction so the rollback below undoes them.
+    conn.autocommit = False
+    try:
+        raw_cursor = conn.cursor()
+        if args.dsn:
+            seed_database(raw_cursor)
+        else:
+            raw_cursor.execute("SET search_path TO ellie_bradley_schema;")
+        cursor = ExplainingCursor(raw_cursor)
+        run_checked_statements(cursor)
+        conn.rollback()
+    finally:
+        conn.close()
+
+    if args.verbose:
+        for query, lines in cursor.plans:
+            print(" ".join(query.split()))
+            print("\n".join(f"    {line}" for line in lines))
+
+    failures = find_wrapped_predicates(cursor.plans)
+    for query, line in failures:
+        print(f"Non-sargable predicate: {line.strip()}\n    in: {' '.join(query.split())}")
+    print(f"Checked {len(cursor.plans)} statements, {len(failures)} non-sargable predicates.")
+    sys.exit(1 if failures else 0)
@@ -2,19 +2,29 @@
 
 """ETL Pipeline for Processing and Uploading Truck Data"""
 import os
+import asyncio
 import logging
 from datetime import datetime, timedelta, timezone
 import pandas as pd
 from dotenv import load_dotenv
-from extract import connect_to_s3, list_files_by_date_and_hour, download_files
-from transform import load_data_from_directory, clean_data, save_clean_data
-from load import upload_transaction_data
+from extract import (connect_to_s3, get_hour_prefix, iter_files_by_date_and_hour,
+                     iter_objects_by_date_and_hour, download_files, fetch_files)
+from transform import (load_data_from_directory, load_data_from_buffers,
+                       clean_data, save_clean_data)
+from load import upload_transaction_data, upload_transaction_frame, fetch_processed_objects
+from manifest import iter_unprocessed_objects
+from t3_shared.instrumentation import RunSummary
+from async_pipeline import run_pipelined
 
 logging.basicConfig(format='%(levelname)s:%(message)s', level=logging.INFO)
 load_dotenv()
 
 BUCKET = os.getenv("BUCKET")
 DOWNLOAD_DIR = "data"
+# Opt-in debug mode that stages raw and cleaned files in DOWNLOAD_DIR.
+DEBUG_TO_DISK = os.getenv("PIPELINE_DEBUG_TO_DISK", "false").lower() in ("1", "true", "yes")
+# "async" overlaps extract, transform and load across all hours; see async_pipeline.py.
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "sequential").lower()
 
 
 def get_recent_datetime_strs(hours=3) -> list[str]:
@@ -25,19 +35,49 @@ def get_recent_datetime_strs(hours=3) -> list[str]:
 
 def extract_data(s3_client, bucket: str, datetime_str: str) -> list[str]:
     """Extract and download files from S3 based on datetime."""
-    files_to_download = list_files_by_date_and_hour(
-        s3_client, bucket, datetime_str)
-    if files_to_download:
-        for file in os.listdir(DOWNLOAD_DIR):
-            os.remove(os.path.join(DOWNLOAD_DIR, file))
-        return download_files(s3_client, bucket, files_to_download, DOWNLOAD_DIR)
-    logging.info("No data files found for datetime %s.", datetime_str)
-    return []
-
-
-def transform_data(input_dir: str, output_file: str) -> pd.DataFrame:
-    """Transform the raw data by loading, cleaning, and saving it."""
+    os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+    for file in os.listdir(DOWNLOAD_DIR):
+        os.remove(os.path.join(DOWNLOAD_DIR, file))
+
+    downloaded_files = download_files(
+        s3_client, bucket, iter_files_by_date_and_hour(s3_client, bucket, datetime_str),
+        DOWNLOAD_DIR)
+    if not downloaded_files:
+        logging.info("No data files found for datetime %s.", datetime_str)
+    return downloaded_files
+
+
+def extract_data_to_memory(s3_client, bucket: str,
+                           datetime_str: str) -> tuple[list[tuple[str, bytes]], list[dict]]:
+    """Extract the new or changed files from S3 based on datetime into memory.
+
+    Returns the fetched (key, contents) pairs and the S3 objects they came from.
+    """
+    processed = fetch_processed_objects(get_hour_prefix(datetime_str))
+    new_objects = []
+
+    def iter_new_keys():
+        for obj in iter_unprocessed_objects(
+                iter_objects_by_date_and_hour(s3_client, bucket, datetime_str), processed):
+            new_objects.append(obj)
+            yield obj["Key"]
+
+    files = fetch_files(s3_client, bucket, iter_new_keys())
+    if not files:
+        logging.info("No new data files found for datetime %s.", datetime_str)
+
+    fetched_keys = {file_key for file_key, _ in files}
+    return files, [obj for obj in new_objects if obj["Key"] in fetched_keys]
+
+
+def transform_data(input_dir: str, output_file: str, counters: dict | None = None) -> pd.DataFrame:
+    """Transform the raw data by loading, cleaning, and saving it.
+
+    The raw row count is stored in counters["rows_in"] when counters is given.
+    """
     raw_data = load_data_from_directory(input_dir)
+    if counters is not None:
+        counters["rows_in"] = len(raw_data)
     if not raw_data.empty:
         cleaned_data = clean_data(raw_data)
         save_clean_data(cleaned_data, output_file)
@@ -46,32 +86,122 @@ def transform_data(input_dir: str, output_file: str) -> pd.DataFrame:
     return pd.DataFrame()
 
 
-def load_data_to_database(cleaned_data_file: str) -> None:
-    """Load the cleaned data into the database."""
-    upload_transaction_data(cleaned_data_file)
-    logging.info("Data loaded into the database successfully.")
+def transform_data_in_memory(files: list[tuple[str, bytes]],
+                             counters: dict | None = None) -> tuple[pd.DataFrame, set[str]]:
+    """Transform raw in-memory files by parsing them once and cleaning the result.
+
+    Also returns the keys of the files that parsed. The raw row count is stored
+    in counters["rows_in"] when counters is given.
+    """
+    raw_data, loaded_keys = load_data_from_buffers(files)
+    if counters is not None:
+        counters["rows_in"] = len(raw_data)
+    if not raw_data.empty:
+        cleaned_data = clean_data(raw_data)
+        logging.info("Data transformation complete.")
+        return cleaned_data, loaded_keys
+    return pd.DataFrame(), loaded_keys
+
+
+def load_data_to_database(cleaned_data: pd.DataFrame, processed_objects: list[dict],
+                          skipped_objects: list[dict]) -> int | None:
+    """Load the cleaned data into the database and record its source objects.
 
+    Returns the number of rows loaded, or None if the load was rolled back.
+    """
+    loaded_rows = upload_transaction_frame(cleaned_data, processed_objects=processed_objects,
+                                           skipped_objects=skipped_objects)
+    if loaded_rows is not None:
+        logging.info("Data loaded into the database successfully.")
+    return loaded_rows
 
-def run_pipeline():
-    """Main function to run the ETL pipeline."""
-    datetime_strs = get_recent_datetime_strs()
-    s3_client = connect_to_s3()
 
-    for datetime_str in datetime_strs:
-        extracted_files = extract_data(s3_client, BUCKET, datetime_str)
+def record_transform_counts(record: dict, cleaned_data: pd.DataFrame) -> None:
+    """Add the cleaned and rejected row counts to a transform stage record."""
+    record["rows_out"] = len(cleaned_data)
+    record["rows_rejected"] = record.get("rows_in", 0) - len(cleaned_data)
 
-        cleaned_data_file = os.path.join(DOWNLOAD_DIR, "cleaned_data.csv")
-        transformed_data = transform_data(DOWNLOAD_DIR, cleaned_data_file)
 
-        if not transformed_data.empty:
-            logging.info("Loading transformed data to database.")
-            load_data_to_database(cleaned_data_file)
+def process_hour_on_disk(s3_client, datetime_str: str, run: RunSummary) -> None:
+    """Run one hour through the pipeline, staging every step as files in DOWNLOAD_DIR.
 
-            for file in extracted_files:
-                os.remove(file)
-        else:
-            logging.warning(
-                "No valid data to load for datetime %s.", datetime_str)
+    This debug path reloads every file for the hour and bypasses the manifest.
+    """
+    with run.stage("extract", hour=datetime_str) as record:
+        extracted_files = extract_data(s3_client, BUCKET, datetime_str)
+        record["files"] = len(extracted_files)
+        record["bytes_downloaded"] = sum(os.path.getsize(file) for file in extracted_files)
+
+    cleaned_data_file = os.path.join(DOWNLOAD_DIR, "cleaned_data.parquet")
+    with run.stage("transform", hour=datetime_str) as record:
+        transformed_data = transform_data(DOWNLOAD_DIR, cleaned_data_file, record)
+        record_transform_counts(record, transformed_data)
+
+    if not transformed_data.empty:
+        logging.info("Loading transformed data to database.")
+        with run.stage("load", hour=datetime_str) as record:
+            record["rows_in"] = len(transformed_data)
+            record["rows_loaded"] = upload_transaction_data(cleaned_data_file)
+        if record["rows_loaded"] is not None:
+            logging.info("Data loaded into the database successfully.")
+
+        for file in extracted_files:
+            os.remove(file)
+    else:
+        logging.warning(
+            "No valid data to load for datetime %s.", datetime_str)
+
+
+def process_hour_in_memory(s3_client, datetime_str: str, run: RunSummary) -> None:
+    """Run one hour through the pipeline without touching the local disk."""
+    with run.stage("extract", hour=datetime_str) as record:
+        extracted_files, new_objects = extract_data_to_memory(
+            s3_client, BUCKET, datetime_str)
+        record["files"] = len(extracted_files)
+        record["bytes_downloaded"] = sum(len(contents) for _, contents in extracted_files)
+
+    with run.stage("transform", hour=datetime_str) as record:
+        transformed_data, loaded_keys = transform_data_in_memory(extracted_files, record)
+        record_transform_counts(record, transformed_data)
+    del extracted_files
+
+    if not new_objects:
+        return
+
+    # Objects that are not truck files or failed to parse keep their earlier rows,
+    # but are still recorded so they are not fetched again until they change.
+    processed_objects = [obj for obj in new_objects if obj["Key"] in loaded_keys]
+    skipped_objects = [obj for obj in new_objects if obj["Key"] not in loaded_keys]
+
+    if transformed_data.empty:
+        logging.info("No valid rows for datetime %s; only recording its objects as processed.",
+                     datetime_str)
+    else:
+        logging.info("Loading transformed data to database.")
+    with run.stage("load", hour=datetime_str) as record:
+        record["rows_in"] = len(transformed_data)
+        record["rows_loaded"] = load_data_to_database(transformed_data, processed_objects,
+                                                      skipped_objects)
+
+
+def run_pipeline():
+    """Main function to run the ETL pipeline, emitting a JSON summary of every stage."""
+    datetime_strs = get_recent_datetime_strs()
+    s3_client = connect_to_s3()
+    run = RunSummary("pipeline_2")
+
+    try:
+        if PIPELINE_MODE == "async" and not DEBUG_TO_DISK:
+            with run.stage("pipelined") as record:
+                asyncio.run(run_pipelined(s3_client, BUCKET, datetime_strs, record))
+            return
+        for datetime_str in datetime_strs:
+            if DEBUG_TO_DISK:
+                process_hour_on_disk(s3_client, datetime_str, run)
+            else:
+                process_hour_in_memory(s3_client, datetime_str, run)
+    finally:
+        run.emit()
 
 
 if __name__ == "__main__":
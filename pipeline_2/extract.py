@@ -3,9 +3,15 @@
 
 """Extraction Script to Download Truck Data from S3."""
 import os
+import time
 import logging
 import argparse
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Executor, ThreadPoolExecutor
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from dotenv import load_dotenv
 
 logging.basicConfig(format='%(levelname)s:%(message)s', level=logging.INFO)
@@ -15,6 +21,11 @@ load_dotenv()
 BUCKET = os.getenv("BUCKET")
 TRUCKS_FOLDER = "trucks/"
 DOWNLOAD_DIR = "data"
+MAX_WORKERS = int(os.getenv("S3_MAX_WORKERS", "8"))
+DOWNLOAD_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 0.5
+# Parallelism comes from the worker pool, so each transfer stays on its own thread.
+TRANSFER_CONFIG = TransferConfig(use_threads=False)
 
 
 def connect_to_s3():
@@ -23,7 +34,8 @@ def connect_to_s3():
         s3_client = boto3.client(
             "s3",
             aws_access_key_id=os.getenv("ACCESS_KEY_ID"),
-            aws_secret_access_key=os.getenv("SECRET_ACCESS_KEY")
+            aws_secret_access_key=os.getenv("SECRET_ACCESS_KEY"),
+            config=Config(max_pool_connections=max(MAX_WORKERS, 10))
         )
         logging.info("Successfully connected to S3.")
         return s3_client
@@ -32,48 +44,139 @@ def connect_to_s3():
         raise
 
 
-def list_files_by_date_and_hour(s3_client, bucket_name: str, datetime_str: str) -> list[str]:
-    """List files in S3 bucket for a given date and time."""
-    year, month, day, hour = map(int, datetime_str.split("-"))
-    date_prefix = f"{TRUCKS_FOLDER}{year}-{month}/{day}/{hour}/"
+def iter_objects(s3_client, bucket_name: str, prefix: str, suffix: str = "") -> Iterator[dict]:
+    """Lazily yield the S3 objects under a prefix, one listing page at a time."""
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            if obj["Key"].endswith(suffix):
+                yield obj
 
-    try:
-        response = s3_client.list_objects_v2(
-            Bucket=bucket_name, Prefix=date_prefix)
 
-        if 'Contents' not in response:
-            return []
+def iter_object_keys(s3_client, bucket_name: str, prefix: str, suffix: str = "") -> Iterator[str]:
+    """Lazily yield the keys of the S3 objects under a prefix."""
+    for obj in iter_objects(s3_client, bucket_name, prefix, suffix):
+        yield obj["Key"]
 
-        matched_files = [obj['Key']
-                         for obj in response['Contents'] if obj['Key'].endswith('.csv')]
 
-        if not matched_files:
-            logging.warning(
-                "No .csv files found for the specified date: %s", date_prefix)
+def get_hour_prefix(datetime_str: str) -> str:
+    """Build the S3 prefix holding truck files for a 'YYYY-MM-DD-HH' datetime string."""
+    year, month, day, hour = map(int, datetime_str.split("-"))
+    return f"{TRUCKS_FOLDER}{year}-{month}/{day}/{hour}/"
+
 
-        return matched_files
+def iter_objects_by_date_and_hour(s3_client, bucket_name: str, datetime_str: str) -> Iterator[dict]:
+    """Lazily yield the .csv objects in the S3 bucket for a given date and time."""
+    try:
+        yield from iter_objects(
+            s3_client, bucket_name, get_hour_prefix(datetime_str), suffix=".csv")
     except Exception as e:
         logging.error("Error listing files: %s", str(e))
-        return []
 
 
-def download_files(s3_client, bucket_name: str, files: list[str], download_dir: str) -> list[str]:
-    """Download specified files from S3 to the local directory."""
-    os.makedirs(download_dir, exist_ok=True)
+def iter_files_by_date_and_hour(s3_client, bucket_name: str, datetime_str: str) -> Iterator[str]:
+    """Lazily yield the .csv keys in the S3 bucket for a given date and time."""
+    for obj in iter_objects_by_date_and_hour(s3_client, bucket_name, datetime_str):
+        yield obj["Key"]
+
+
+def list_files_by_date_and_hour(s3_client, bucket_name: str, datetime_str: str) -> list[str]:
+    """List files in S3 bucket for a given date and time."""
+    return list(iter_files_by_date_and_hour(s3_client, bucket_name, datetime_str))
+
+
+def bounded_map(executor: Executor, func: Callable, items: Iterable, window: int) -> Iterator:
+    """Like executor.map, but only pulls from items while fewer than window calls are pending.
 
-    downloaded_files = []
+    Results are yielded in input order, so work starts on the first items of a
+    lazy iterable while later ones are still being produced.
+    """
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
 
-    for file_key in files:
-        file_name = os.path.basename(file_key)
-        local_path = os.path.join(download_dir, file_name)
+
+def call_with_retry(operation: Callable, file_key: str, retries: int = DOWNLOAD_RETRIES):
+    """Call an S3 operation for a file, retrying with exponential backoff on failure."""
+    for attempt in range(1, retries + 1):
         try:
-            s3_client.download_file(bucket_name, file_key, local_path)
-            downloaded_files.append(local_path)
-            logging.info("Downloaded file: %s", file_key)
+            return operation()
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+            logging.warning("Retrying %s in %.1fs (attempt %d of %d): %s",
+                            file_key, delay, attempt, retries, str(e))
+            time.sleep(delay)
+    return None
+
+
+def download_file_with_retry(s3_client, bucket_name: str, file_key: str, local_path: str,
+                             retries: int = DOWNLOAD_RETRIES) -> str:
+    """Download a single file from S3, retrying with exponential backoff on failure."""
+    call_with_retry(lambda: s3_client.download_file(
+        bucket_name, file_key, local_path, Config=TRANSFER_CONFIG), file_key, retries)
+    logging.info("Downloaded file: %s", file_key)
+    return local_path
+
+
+def read_file_with_retry(s3_client, bucket_name: str, file_key: str,
+                         retries: int = DOWNLOAD_RETRIES) -> bytes:
+    """Read a single file from S3 into memory, retrying with exponential backoff on failure."""
+    body = call_with_retry(lambda: s3_client.get_object(
+        Bucket=bucket_name, Key=file_key)["Body"].read(), file_key, retries)
+    logging.info("Read file: %s", file_key)
+    return body
+
+
+def download_files(s3_client, bucket_name: str, files: Iterable[str], download_dir: str,
+                   max_workers: int = MAX_WORKERS) -> list[str]:
+    """Download specified files from S3 to the local directory using a pool of threads.
+
+    Keys may be a lazy iterable such as iter_files_by_date_and_hour; paths are
+    returned in the same order as the keys, and files that still fail after
+    retrying are logged and left out.
+    """
+    os.makedirs(download_dir, exist_ok=True)
+
+    def download(file_key: str) -> str | None:
+        local_path = os.path.join(download_dir, os.path.basename(file_key))
+        try:
+            return download_file_with_retry(s3_client, bucket_name, file_key, local_path)
         except Exception as e:
             logging.error("Error downloading file %s: %s", file_key, str(e))
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        downloaded_files = list(
+            bounded_map(executor, download, files, window=max_workers * 2))
+
+    return [local_path for local_path in downloaded_files if local_path]
+
+
+def fetch_files(s3_client, bucket_name: str, files: Iterable[str],
+                max_workers: int = MAX_WORKERS) -> list[tuple[str, bytes]]:
+    """Read specified files from S3 into memory using a pool of threads.
+
+    Returns (key, contents) pairs in the same order as the keys, skipping files
+    that still fail after retrying.
+    """
+    def fetch(file_key: str) -> tuple[str, bytes] | None:
+        try:
+            return file_key, read_file_with_retry(s3_client, bucket_name, file_key)
+        except Exception as e:
+            logging.error("Error reading file %s: %s", file_key, str(e))
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        fetched_files = list(
+            bounded_map(executor, fetch, files, window=max_workers * 2))
 
-    return downloaded_files
+    return [fetched for fetched in fetched_files if fetched]
 
 
 if __name__ == "__main__":
@@ -85,11 +188,9 @@ if __name__ == "__main__":
 
     s3_client = connect_to_s3()
 
-    files_to_download = list_files_by_date_and_hour(
-        s3_client, BUCKET, args.datetime)
+    downloaded_files = download_files(
+        s3_client, BUCKET, iter_files_by_date_and_hour(s3_client, BUCKET, args.datetime),
+        DOWNLOAD_DIR)
 
-    if files_to_download:
-        downloaded_files = download_files(
-            s3_client, BUCKET, files_to_download, DOWNLOAD_DIR)
-    else:
+    if not downloaded_files:
         logging.info("No files downloaded.")
@@ -0,0 +1,143 @@
+"""Generate synthetic truck transaction files in the layouts both pipelines read.
+
+Usage: python generate_truck_data.py --output-dir sample_bucket --trucks 6 --days 30
+       python generate_truck_data.py --bucket bench-trucks --transactions-per-hour 500
+
+Writes historical/T3_historical_<truck_id>.parquet files for pipeline/ and
+trucks/YYYY-M/D/H/T3_T<truck_id>_<hour>.csv files for pipeline_2/, covering
+the last --hours UTC hours so the hourly ETL picks them up. A --dirty-rate
+share of rows carry VOID, blank, zero, negative or over-limit totals, or
+unknown payment types. Both cleaners drop the VOID, blank and zero totals and
+the unknown types; only pipeline_2's also drops negative and over-limit
+totals. With --bucket the files are uploaded instead; set AWS_ENDPOINT_URL_S3
+to target a local stand-in.
+"""
+import io
+import os
+import argparse
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+
+HISTORICAL_FOLDER = "historical/"
+TRUCKS_FOLDER = "trucks/"
+PAYMENT_TYPES = np.array(["card", "cash"])
+PAYMENT_TYPE_WEIGHTS = [0.7, 0.3]
+# Dirty totals; pipeline/ keeps the negative and over-limit ones, pipeline_2/ rejects all five.
+DIRTY_TOTALS = np.array(["VOID", "", "0.00", "-4.50", "150.00"], dtype=object)
+UNKNOWN_PAYMENT_TYPE = "voucher"
+
+
+def get_generated_hours(hours: int, now: datetime | None = None) -> list[datetime]:
+    """The start of each of the last `hours` UTC hours, matching get_recent_datetime_strs."""
+    now = (now or datetime.now(timezone.utc)).replace(minute=0, second=0, microsecond=0)
+    return [now - timedelta(hours=i) for i in range(hours)]
+
+
+def format_pounds(pence: np.ndarray) -> np.ndarray:
+    """Format integer pence as pound strings with two decimal places."""
+    return np.char.mod("%d.", pence // 100).astype(object) + np.char.zfill(
+        (pence % 100).astype(str), 2).astype(object)
+
+
+def make_transactions(rng: np.random.Generator, start: datetime, hours: int,
+                      transactions_per_hour: int, dirty_rate: float) -> pd.DataFrame:
+    """Build one truck's raw transactions over `hours` hours from `start`, in time order."""
+    rows = hours * transactions_per_hour
+    offsets = np.sort(rng.integers(0, hours * 3600, rows)).astype("timedelta64[s]")
+    total = format_pounds(rng.integers(250, 2500, rows))
+    payment_type = rng.choice(PAYMENT_TYPES, rows, p=PAYMENT_TYPE_WEIGHTS).astype(object)
+
+    dirty = np.flatnonzero(rng.random(rows) < dirty_rate)
+    kinds = rng.integers(0, len(DIRTY_TOTALS) + 1, len(dirty))
+    bad_total = kinds < len(DIRTY_TOTALS)
+    total[dirty[bad_total]] = DIRTY_TOTALS[kinds[bad_total]]
+    payment_type[dirty[~bad_total]] = UNKNOWN_PAYMENT_TYPE
+
+    return pd.DataFrame({
+        "timestamp": np.datetime64(start.replace(tzinfo=None), "s") + offsets,
+        "type": payment_type,
+        "total": total
+    })
+
+
+def iter_historical_files(rng: np.random.Generator, trucks: int, days: int,
+                          transactions_per_hour: int, dirty_rate: float,
+                          end: datetime) -> Iterator[tuple[str, bytes]]:
+    """Yield (key, parquet bytes) for one historical file per truck, ending at `end`."""
+    start = end - timedelta(days=days)
+    for truck_id in range(1, trucks + 1):
+        df = make_transactions(rng, start, days * 24, transactions_per_hour, dirty_rate)
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, index=False)
+        yield f"{HISTORICAL_FOLDER}T3_historical_{truck_id}.parquet", buffer.getvalue()
+
+
+def iter_hourly_files(rng: np.random.Generator, trucks: int, hours: list[datetime],
+                      transactions_per_hour: int, dirty_rate: float) -> Iterator[tuple[str, bytes]]:
+    """Yield (key, CSV bytes) for one file per truck in each hour."""
+    for hour in hours:
+        # Unpadded month, day and hour, as extract.get_hour_prefix lists them.
+        prefix = f"{TRUCKS_FOLDER}{hour.year}-{hour.month}/{hour.day}/{hour.hour}/"
+        for truck_id in range(1, trucks + 1):
+            df = make_transactions(rng, hour, 1, transactions_per_hour, dirty_rate)
+            key = f"{prefix}T3_T{truck_id}_{hour:%Y%m%d%H}.csv"
+            yield key, df.to_csv(index=False).encode("utf-8")
+
+
+def generate_files(trucks: int = 6, days: int = 30, hours: int = 3,
+                   transactions_per_hour: int = 40, dirty_rate: float = 0.05,
+                   seed: int = 7) -> Iterator[tuple[str, bytes]]:
+    """Yield every historical and hourly file for one synthetic bucket."""
+    rng = np.random.default_rng(seed)
+    generated_hours = get_generated_hours(hours)
+    yield from iter_historical_files(rng, trucks, days, transactions_per_hour,
+                                     dirty_rate, generated_hours[-1])
+    yield from iter_hourly_files(rng, trucks, generated_hours,
+                                 transactions_per_hour, dirty_rate)
+
+
+def write_to_directory(files: Iterator[tuple[str, bytes]], output_dir: str) -> int:
+    """Write each file under output_dir at its key and return the bytes written."""
+    written = 0
+    for key, contents in files:
+        path = os.path.join(output_dir, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(contents)
+        written += len(contents)
+    return written
+
+
+def upload_to_bucket(s3_client, bucket: str, files: Iterator[tuple[str, bytes]]) -> int:
+    """Upload each file to the bucket at its key and return the bytes uploaded."""
+    uploaded = 0
+    for key, contents in files:
+        s3_client.put_object(Bucket=bucket, Key=key, Body=contents)
+        uploaded += len(contents)
+    return uploaded
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic truck data files.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--output-dir", help="Write the files under this directory.")
+    target.add_argument("--bucket", help="Upload the files to this S3 bucket.")
+    parser.add_argument("--trucks", type=int, default=6)
+    parser.add_argument("--days", type=int, default=30, help="Days of historical data.")
+    parser.add_argument("--hours", type=int, default=3, help="Recent hours of CSV files.")
+    parser.add_argument("--transactions-per-hour", type=int, default=40,
+                        help="Transactions per truck per hour.")
+    parser.add_argument("--dirty-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    files = generate_files(args.trucks, args.days, args.hours,
+                           args.transactions_per_hour, args.dirty_rate, args.seed)
+    if args.output_dir:
+        size = write_to_directory(files, args.output_dir)
+    else:
+        import boto3
+        size = upload_to_bucket(boto3.client("s3"), args.bucket, files)
+    print(f"Generated {size / 1024 ** 2:.1f} MiB of truck data.")
@@ -1,18 +1,36 @@
-from report_generator import get_previous_day, get_redshift_connection, set_schema, gather_report_data, generate_html_report
+import json
+from report_generator import (get_previous_day, set_schema, gather_report_data,
+                              generate_report_json, generate_html_report)
+from t3_shared.report_cache import read_artifact, write_artifacts
+from t3_shared.connection import ConnectionPool
 from typing import Dict
 
+# Created once per container, so warm invocations reuse the open connection
+# instead of paying for a new TLS handshake and login.
+POOL = ConnectionPool(max_size=1)
 
-def lambda_handler(event: dict, context: dict) -> Dict[str, str]:
-    prev_day = get_previous_day()
-    conn = get_redshift_connection()
-    cursor = conn.cursor()
 
-    set_schema(cursor)
-    report_data = gather_report_data(cursor, prev_day)
+def render_report(prev_day: str) -> str:
+    """Render a day's report from Redshift and store its JSON and HTML for later requests."""
+    with POOL.connection() as conn:
+        cursor = conn.cursor()
+
+        set_schema(cursor)
+        report_data = gather_report_data(cursor, prev_day)
+
+        cursor.close()
+
     html_content = generate_html_report(report_data, prev_day)
+    write_artifacts(prev_day, {
+        "json": json.dumps(generate_report_json(report_data, prev_day), indent=4),
+        "html": html_content
+    })
+    return html_content
+
 
-    cursor.close()
-    conn.close()
+def lambda_handler(event: dict, context: dict) -> Dict[str, str]:
+    prev_day = get_previous_day()
+    html_content = read_artifact(prev_day, "html") or render_report(prev_day)
 
     return {
         "statusCode": 200,
@@ -2,65 +2,209 @@
 
 """Import modules"""
 import os
+import io
+import gzip
 import logging
+from datetime import date, datetime, timezone
+import boto3
 import pandas as pd
-import redshift_connector
+import pyarrow.parquet as pq
 from dotenv import load_dotenv
+from manifest import get_loaded_time_ranges, get_processed_objects, record_processed_objects
+from t3_shared.connection import get_pool
+from t3_shared.transaction_schema import cast_transactions
+from t3_shared.rollups import refresh_rollups
+from t3_shared.report_cache import invalidate_reports
 
 logging.basicConfig(format='%(levelname)s:%(message)s', level=logging.INFO)
 load_dotenv()
 
+LOAD_CHUNK_SIZE = int(os.getenv("LOAD_CHUNK_SIZE", "5000"))
+MAX_BIND_PARAMETERS = 32767
+COPY_STAGING_PREFIX = "staging/"
 
-def get_redshift_connection():
-    """Establish and return a connection to the Redshift database."""
+TRANSACTION_COLUMNS = ["truck_id", "payment_method_id",
+                       "total", "timestamp", "source_key"]
+INSERT_COLUMNS = "(truck_id, payment_method_id, total, at, source_key)"
+
+
+def get_transaction_rows(df: pd.DataFrame) -> list[tuple]:
+    """Convert the transaction columns of a DataFrame into native Python row tuples."""
+    return list(zip(*(df[column].tolist() for column in TRANSACTION_COLUMNS)))
+
+
+def insert_transactions_batched(cursor, rows: list[tuple], chunk_size: int = LOAD_CHUNK_SIZE) -> int:
+    """Insert rows into FACT_Transaction with one multi-row VALUES statement per chunk."""
+    chunk_size = max(1, min(chunk_size, MAX_BIND_PARAMETERS // len(TRANSACTION_COLUMNS)))
+    row_placeholder = f"({', '.join(['%s'] * len(TRANSACTION_COLUMNS))})"
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        insert_query = f"""
+        INSERT INTO FACT_Transaction {INSERT_COLUMNS}
+        VALUES {", ".join([row_placeholder] * len(chunk))};
+        """
+        cursor.execute(insert_query, [value for row in chunk for value in row])
+
+    return len(rows)
+
+
+def delete_transactions_for_sources(cursor,
+                                    time_ranges: dict[str, tuple[datetime, datetime] | None]) -> None:
+    """Delete previously loaded transactions for the given S3 objects, so reloads replace them.
+
+    time_ranges maps each object to the first and last timestamp it loaded, as
+    stored in the manifest. The delete is bounded by those timestamps so the
+    at sort key prunes the scan; objects that loaded no rows are skipped.
+    """
+    time_ranges = {key: time_range for key, time_range in time_ranges.items() if time_range}
+    if not time_ranges:
+        return
+    source_keys = list(time_ranges)
+    first_at = min(first for first, _ in time_ranges.values())
+    last_at = max(last for _, last in time_ranges.values())
+    cursor.execute(f"""
+    DELETE FROM FACT_Transaction
+    WHERE at BETWEEN %s AND %s
+      AND source_key IN ({", ".join(["%s"] * len(source_keys))});
+    """, [first_at, last_at, *source_keys])
+
+
+def get_source_time_ranges(df: pd.DataFrame) -> dict[str, tuple[datetime, datetime]]:
+    """Return the first and last timestamp of the batch's rows from each source object."""
+    if df.empty:
+        return {}
+    bounds = df.groupby('source_key', observed=True)['timestamp'].agg(['min', 'max'])
+    return {key: (first.to_pydatetime(), last.to_pydatetime())
+            for key, first, last in bounds.itertuples()}
+
+
+def get_frame_day_range(df: pd.DataFrame) -> tuple[date, date] | None:
+    """Return the first and last day covered by a batch of transactions."""
+    if df.empty:
+        return None
+    return df['timestamp'].min().date(), df['timestamp'].max().date()
+
+
+def stage_transactions_csv(df: pd.DataFrame) -> bytes:
+    """Serialise the transaction columns to a gzip-compressed CSV for COPY."""
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb") as gz_file:
+        gz_file.write(df[TRANSACTION_COLUMNS].to_csv(index=False).encode("utf-8"))
+    return buffer.getvalue()
+
+
+def copy_transactions_from_s3(cursor, df: pd.DataFrame, bucket: str, iam_role: str) -> int:
+    """Stage the batch in S3 and load it into FACT_Transaction with a single COPY."""
+    s3 = boto3.client("s3", aws_access_key_id=os.getenv("ACCESS_KEY_ID"),
+                      aws_secret_access_key=os.getenv("SECRET_ACCESS_KEY"))
+    staging_key = (f"{COPY_STAGING_PREFIX}fact_transaction_"
+                   f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')}.csv.gz")
+    s3.put_object(Bucket=bucket, Key=staging_key, Body=stage_transactions_csv(df))
     try:
-        conn = redshift_connector.connect(
-            host=os.environ["HOST"],
-            port=int(os.environ.get("PORT", 5439)),
-            user=os.environ["USERNAME"],
-            password=os.environ["PASSWORD"],
-            database=os.environ["DATABASE_NAME"]
-        )
-        conn.autocommit = True
-        logging.info("Connected to Redshift.")
-        return conn
-    except Exception as e:
-        logging.error("Error connecting to Redshift: %s", str(e))
-        raise
+        cursor.execute(f"""
+        COPY FACT_Transaction {INSERT_COLUMNS}
+        FROM 's3://{bucket}/{staging_key}'
+        IAM_ROLE '{iam_role}'
+        CSV GZIP IGNOREHEADER 1 TIMEFORMAT 'auto';
+        """)
+    finally:
+        s3.delete_object(Bucket=bucket, Key=staging_key)
+    return len(df)
+
+
+def upload_transaction_data(data_file: str, chunk_size: int = LOAD_CHUNK_SIZE) -> int | None:
+    """Uploads transaction data from a cleaned Parquet file to Redshift database."""
+    return upload_transaction_frame(
+        cast_transactions(pq.read_table(data_file).to_pandas()), chunk_size)
 
 
-def upload_transaction_data(data_file: str):
-    """Uploads transaction data to Redshift database."""
-    df = pd.read_csv(data_file)
-    conn = get_redshift_connection()
+def fetch_processed_objects(prefix: str) -> dict[str, tuple[str, int]]:
+    """Retrieve the manifest entries for the objects already loaded under an S3 prefix."""
+    conn = get_pool().acquire()
     try:
         with conn.cursor() as cursor:
             cursor.execute(f"SET search_path TO {os.environ['SCHEMA']};")
-            insert_query = """
-            INSERT INTO FACT_Transaction (truck_id, payment_method_id, total, at)
-            VALUES (%s, %s, %s, %s);
-            """
-            for _, row in df.iterrows():
-                cursor.execute(insert_query, (
-                    row['truck_id'],
-                    row['payment_method_id'],
-                    row['total'],
-                    row['timestamp']
-                ))
-
-            logging.info("Data uploaded to Redshift.")
+            return get_processed_objects(cursor, prefix)
+    finally:
+        get_pool().release(conn)
+
+
+def upload_transaction_frame(df: pd.DataFrame, chunk_size: int = LOAD_CHUNK_SIZE,
+                             processed_objects: list[dict] | None = None,
+                             skipped_objects: list[dict] | None = None) -> int | None:
+    """Uploads a cleaned transaction DataFrame to Redshift database in a single transaction.
+
+    Uses a staged S3 COPY when COPY_STAGING_BUCKET and COPY_IAM_ROLE are set,
+    otherwise falls back to batched multi-row INSERT statements. When the S3
+    objects behind the batch are given, the earlier rows of those already in
+    the manifest are replaced, and every object is recorded in the manifest.
+    Skipped objects, which are not truck files or failed to parse, are recorded
+    too so they are not fetched again until they change; any rows loaded from
+    an earlier version of them are kept.
+    The daily and hourly rollups for every affected day are rebuilt in the
+    same transaction, and once it commits any cached reports for those days
+    are invalidated. Returns the number of rows loaded, or None if the upload
+    was rolled back.
+    """
+    if "source_key" not in df.columns:
+        df = df.assign(source_key=None)
+
+    conn = get_pool().acquire()
+    conn.autocommit = False
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"SET search_path TO {os.environ['SCHEMA']};")
+            staging_bucket = os.getenv("COPY_STAGING_BUCKET")
+            iam_role = os.getenv("COPY_IAM_ROLE")
+
+            objects = (processed_objects or []) + (skipped_objects or [])
+            loaded_ranges = get_loaded_time_ranges(cursor, [obj["Key"] for obj in objects])
+            # Only processed objects already in the manifest have rows to replace.
+            replaced_ranges = {obj["Key"]: loaded_ranges[obj["Key"]]
+                               for obj in processed_objects or [] if obj["Key"] in loaded_ranges}
+
+            day_ranges = [get_frame_day_range(df)]
+            # The rows being replaced span the days stored in the manifest.
+            day_ranges.extend((first_at.date(), last_at.date())
+                              for first_at, last_at in filter(None, replaced_ranges.values()))
+            delete_transactions_for_sources(cursor, replaced_ranges)
+
+            if df.empty:
+                loaded_rows = 0
+            elif staging_bucket and iam_role:
+                loaded_rows = copy_transactions_from_s3(
+                    cursor, df, staging_bucket, iam_role)
+            else:
+                loaded_rows = insert_transactions_batched(
+                    cursor, get_transaction_rows(df), chunk_size)
+
+            refresh_rollups(cursor, day_ranges)
+            time_ranges = get_source_time_ranges(df)
+            # Skipped objects keep the range of the rows they loaded before.
+            time_ranges.update((obj["Key"], loaded_ranges[obj["Key"]])
+                               for obj in skipped_objects or [] if loaded_ranges.get(obj["Key"]))
+            record_processed_objects(cursor, objects, time_ranges)
+
+        conn.commit()
+        logging.info("Uploaded %d rows to Redshift.", loaded_rows)
 
     except Exception as e:
+        conn.rollback()
         logging.error("Error uploading data: %s", str(e))
+        return None
 
     finally:
-        conn.close()
+        get_pool().release(conn)
+
+    invalidate_reports(day_ranges)
+    return loaded_rows
 
 
 if __name__ == "__main__":
 
     data = os.getenv(
-        "DATA_FILE", "data/cleaned_data.csv")
+        "DATA_FILE", "data/cleaned_data.parquet")
 
     logging.info("Starting data upload for file: %s", data)
     upload_transaction_data(data)
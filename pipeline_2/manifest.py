@@ -0,0 +1,76 @@
+"""Manifest of the S3 objects that have already been loaded into FACT_Transaction.
+
+Each processed object is stored in ETL_Processed_Object with the ETag and size
+it had when it was loaded, so a run only picks up new or changed objects. The
+first and last timestamps of its rows are stored too, so replacing a changed
+object's rows only touches that range of FACT_Transaction.
+"""
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timezone
+
+
+def get_object_signature(obj: dict) -> tuple[str, int]:
+    """Return the (ETag, size) pair identifying one version of an S3 object."""
+    return obj["ETag"].strip('"'), int(obj["Size"])
+
+
+def get_processed_objects(cursor, prefix: str) -> dict[str, tuple[str, int]]:
+    """Retrieve the signatures of every processed object under an S3 prefix."""
+    cursor.execute("""
+        SELECT object_key, etag, size
+        FROM ETL_Processed_Object
+        WHERE object_key LIKE %s
+    """, (f"{prefix}%",))
+    return {object_key: (etag, int(size)) for object_key, etag, size in cursor.fetchall()}
+
+
+def get_loaded_time_ranges(cursor, keys: list[str]) -> dict[str, tuple[datetime, datetime] | None]:
+    """Retrieve the stored row time range of each key already in the manifest.
+
+    Keys missing from the result are new objects; None means the object loaded no rows.
+    """
+    if not keys:
+        return {}
+    cursor.execute(f"""
+        SELECT object_key, first_at, last_at
+        FROM ETL_Processed_Object
+        WHERE object_key IN ({", ".join(["%s"] * len(keys))})
+    """, keys)
+    return {object_key: (first_at, last_at) if first_at else None
+            for object_key, first_at, last_at in cursor.fetchall()}
+
+
+def iter_unprocessed_objects(objects: Iterable[dict],
+                             processed: dict[str, tuple[str, int]]) -> Iterator[dict]:
+    """Lazily yield the objects that are new or have changed since they were processed."""
+    for obj in objects:
+        if processed.get(obj["Key"]) != get_object_signature(obj):
+            yield obj
+
+
+def record_processed_objects(cursor, objects: list[dict],
+                             time_ranges: dict[str, tuple[datetime, datetime]]) -> None:
+    """Upsert the manifest entries for objects loaded in the current transaction.
+
+    time_ranges holds the first and last timestamp loaded from each object;
+    objects missing from it loaded no rows.
+    """
+    if not objects:
+        return
+
+    keys = [obj["Key"] for obj in objects]
+    cursor.execute(f"""
+        DELETE FROM ETL_Processed_Object
+        WHERE object_key IN ({", ".join(["%s"] * len(keys))})
+    """, keys)
+
+    processed_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    params = []
+    for obj in objects:
+        etag, size = get_object_signature(obj)
+        first_at, last_at = time_ranges.get(obj["Key"], (None, None))
+        params.extend([obj["Key"], etag, size, processed_at, first_at, last_at])
+    cursor.execute(f"""
+        INSERT INTO ETL_Processed_Object (object_key, etag, size, processed_at, first_at, last_at)
+        VALUES {", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(objects))}
+    """, params)
@@ -0,0 +1,98 @@
+"""Measure the report Lambda's import time and image size before and after a change.
+
+Usage: python measure_lambda_cold_start.py --before-ref HEAD~1 [--build]
+
+Exports the repository at --before-ref into a temporary directory and, for
+both that tree and the working tree, imports lambda_function in a fresh
+interpreter under `python -X importtime`, with shared/ on the path, reporting
+the total and the slowest direct imports. With --build it also builds both
+images from dockerfile.lambda and compares their sizes. Modules missing from the local environment are reported
+as import failures rather than timed.
+"""
+import os
+import re
+import io
+import tarfile
+import tempfile
+import argparse
+import subprocess
+import sys
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(PACKAGE_DIR)
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def export_tree(ref: str, destination: str) -> str:
+    """Write the repository as it was at a git ref into destination."""
+    archive = subprocess.run(
+        ["git", "archive", "--format=tar", ref],
+        cwd=REPO_DIR, check=True, capture_output=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(destination)
+    return destination
+
+
+def measure_import(tree: str, module: str = "lambda_function") -> tuple[int, list[tuple[int, str]]]:
+    """Return the cumulative import time in microseconds and the module's slowest direct imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.join(tree, "pipeline_2"), capture_output=True, text=True, check=False,
+        env={**os.environ, "PYTHONPATH": os.path.join(tree, "shared")})
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    # Children are listed before their parent, indented two spaces deeper.
+    lines = [(int(match.group(2)), len(match.group(3)), match.group(4))
+             for match in map(IMPORTTIME_LINE.match, result.stderr.splitlines()) if match]
+    module_index = max(i for i, (_, depth, name) in enumerate(lines) if name == module and depth == 1)
+    direct_imports = []
+    for cumulative, depth, name in reversed(lines[:module_index]):
+        if depth == 1:
+            break
+        if depth == 3:
+            direct_imports.append((cumulative, name))
+    return lines[module_index][0], sorted(direct_imports, reverse=True)[:5]
+
+
+def build_image_size(tree: str, tag: str) -> int:
+    """Build the Lambda image from a tree and return its size in bytes.
+
+    Trees from before shared/ existed are built from pipeline_2/ as their context.
+    """
+    if os.path.isdir(os.path.join(tree, "shared")):
+        build_args, context = ["-f", "pipeline_2/dockerfile.lambda", "."], tree
+    else:
+        build_args, context = ["-f", "dockerfile.lambda", "."], os.path.join(tree, "pipeline_2")
+    subprocess.run(["docker", "build", "-q", "-t", tag, *build_args],
+                   cwd=context, check=True, capture_output=True)
+    return int(subprocess.run(
+        ["docker", "image", "inspect", "-f", "{{.Size}}", tag],
+        check=True, capture_output=True, text=True).stdout)
+
+
+def report(label: str, tree: str, build: bool) -> None:
+    """Print the import time, slowest imports and optionally the image size of a tree."""
+    try:
+        total, slowest = measure_import(tree)
+        print(f"{label:<7} import lambda_function {total / 1000:>8.1f} ms")
+        for cumulative, name in slowest:
+            print(f"        {name:<30} {cumulative / 1000:>8.1f} ms")
+    except RuntimeError as e:
+        print(f"{label:<7} import failed: {e}")
+    if build:
+        size = build_image_size(tree, f"t3-report-lambda:{label}")
+        print(f"{label:<7} image size {size / 1024 ** 2:>8.1f} MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure Lambda import time and image size.")
+    parser.add_argument("--before-ref", default="HEAD~1",
+                        help="git ref to compare the working tree against")
+    parser.add_argument("--build", action="store_true",
+                        help="also build both Docker images and compare their sizes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as before_tree:
+        report("before", export_tree(args.before_ref, before_tree), args.build)
+    report("after", REPO_DIR, args.build)
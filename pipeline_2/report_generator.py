@@ -1,8 +1,21 @@
+from __future__ import annotations
 import os
 import json
-from datetime import datetime, timedelta
-from psycopg2.extensions import cursor
-from load import get_redshift_connection
+import logging
+from collections.abc import Iterable, Iterator
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import TYPE_CHECKING
+from t3_shared.connection import get_pool
+
+if TYPE_CHECKING:
+    from redshift_connector import Cursor as cursor
+
+PENCE_PER_POUND = 100
+REPORT_FOLDER = "report_data"
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "0")) or os.cpu_count() or 1
+REPORT_TITLES = {"day": "Daily", "week": "Weekly", "month": "Monthly"}
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
 
 
 def get_previous_day() -> str:
@@ -15,72 +28,87 @@ def set_schema(cursor: cursor) -> None:
     cursor.execute("SET search_path TO ellie_bradley_schema;")
 
 
-def get_total_transaction_value_all_trucks(cursor: cursor, previous_day: str) -> float:
-    """Retrieve the total transaction value across all trucks."""
-    cursor.execute("""
-        SELECT SUM(total) AS total_transaction_value_all_trucks
-        FROM FACT_Transaction
-        WHERE DATE(at) = %s
-    """, (previous_day,))
-    return cursor.fetchone()[0]
-
-
-def get_truck_data_summary(cursor: cursor, previous_day: str) -> list:
-    """Retrieve summary data for each truck, ordered by total transaction value."""
-    cursor.execute("""
-        SELECT truck_id, SUM(total) AS total_revenue, AVG(total) AS average_transaction_value,
-               COUNT(*) AS transaction_count
-        FROM FACT_Transaction
-        WHERE DATE(at) = %s
-        GROUP BY truck_id
-        ORDER BY total_revenue DESC
-    """, (previous_day,))
-    return cursor.fetchall()
-
-
-def get_transaction_count_per_truck(cursor: cursor, previous_day: str) -> list:
-    """Retrieve transaction count per truck, ordered from highest to lowest."""
+def get_truck_totals(cursor: cursor, previous_day: str) -> list[tuple[int, int, int]]:
+    """Retrieve revenue (in pence) and transaction count per truck in a single grouped query."""
     cursor.execute("""
-        SELECT truck_id, COUNT(*) AS transaction_count
-        FROM FACT_Transaction
-        WHERE DATE(at) = %s
+        SELECT truck_id, SUM(total_revenue) AS total_revenue,
+               SUM(transaction_count) AS transaction_count
+        FROM AGG_Daily_Truck_Summary
+        WHERE day = %s
         GROUP BY truck_id
-        ORDER BY transaction_count DESC
     """, (previous_day,))
-    return cursor.fetchall()
+    return [(truck_id, int(total_revenue), int(transaction_count))
+            for truck_id, total_revenue, transaction_count in cursor.fetchall()]
 
 
-def get_average_transaction_value_per_truck(cursor: cursor, previous_day: str) -> list:
-    """Retrieve average transaction value per truck, ordered from highest to lowest."""
+def get_truck_totals_by_day(cursor: cursor, first_day: str,
+                            last_day: str) -> dict[str, list[tuple[int, int, int]]]:
+    """Retrieve revenue (in pence) and transaction count per truck for every day in a range in one grouped query."""
     cursor.execute("""
-        SELECT truck_id, AVG(total) AS average_transaction_value
-        FROM FACT_Transaction
-        WHERE DATE(at) = %s
-        GROUP BY truck_id
-        ORDER BY average_transaction_value DESC
-    """, (previous_day,))
-    return cursor.fetchall()
+        SELECT day, truck_id, SUM(total_revenue) AS total_revenue,
+               SUM(transaction_count) AS transaction_count
+        FROM AGG_Daily_Truck_Summary
+        WHERE day BETWEEN %s AND %s
+        GROUP BY day, truck_id
+        ORDER BY day
+    """, (first_day, last_day))
+    totals_by_day = {}
+    for day, truck_id, total_revenue, transaction_count in cursor.fetchall():
+        totals_by_day.setdefault(str(day), []).append(
+            (truck_id, int(total_revenue), int(transaction_count)))
+    return totals_by_day
+
+
+def get_period_start(day: str, period: str) -> str:
+    """Get the Monday of a day's week or the first of its month."""
+    day = date.fromisoformat(day)
+    if period == "week":
+        return (day - timedelta(days=day.weekday())).isoformat()
+    return day.replace(day=1).isoformat()
+
+
+def summarise_periods(totals_by_day: dict[str, list[tuple[int, int, int]]],
+                      period: str) -> dict[str, list[tuple[int, int, int]]]:
+    """Add up each truck's daily revenue and transaction counts per week or month."""
+    period_totals = {}
+    for day, truck_totals in totals_by_day.items():
+        trucks = period_totals.setdefault(get_period_start(day, period), {})
+        for truck_id, total_revenue, transaction_count in truck_totals:
+            revenue, count = trucks.get(truck_id, (0, 0))
+            trucks[truck_id] = (revenue + total_revenue, count + transaction_count)
+    return {start: [(truck_id, revenue, count) for truck_id, (revenue, count) in trucks.items()]
+            for start, trucks in period_totals.items()}
+
+
+def build_report_data(truck_totals: list[tuple[int, int, int]]) -> dict:
+    """Derive every report section from the per-truck revenue and transaction counts."""
+    truck_data_summary = sorted(
+        ((truck_id, total_revenue / PENCE_PER_POUND,
+          total_revenue / transaction_count / PENCE_PER_POUND, transaction_count)
+         for truck_id, total_revenue, transaction_count in truck_totals),
+        key=lambda truck: truck[1], reverse=True)
+
+    total_revenue = sum(truck[1] for truck in truck_totals)
+    total_count = sum(truck[2] for truck in truck_totals)
 
-
-def get_average_total_transaction_value(cursor: cursor, previous_day: str) -> float:
-    """Retrieve the average transaction value across all trucks."""
-    cursor.execute("""
-        SELECT AVG(total) AS average_total_transaction_value
-        FROM FACT_Transaction
-        WHERE DATE(at) = %s
-    """, (previous_day,))
-    return cursor.fetchone()[0]
+    return {
+        "total_transaction_value_all_trucks":
+            total_revenue / PENCE_PER_POUND if truck_totals else None,
+        "truck_data_summary": truck_data_summary,
+        "transaction_count_per_truck": sorted(
+            ((truck_id, count) for truck_id, _, _, count in truck_data_summary),
+            key=lambda truck: truck[1], reverse=True),
+        "average_transaction_value_per_truck": sorted(
+            ((truck_id, average) for truck_id, _, average, _ in truck_data_summary),
+            key=lambda truck: truck[1], reverse=True),
+        "average_total_transaction_value":
+            total_revenue / total_count / PENCE_PER_POUND if total_count else None
+    }
 
 
 def gather_report_data(cursor: cursor, previous_day: str) -> dict:
-    """Gather all report data by calling individual data retrieval functions."""
-    return {
-        "total_transaction_value_all_trucks": get_total_transaction_value_all_trucks(cursor, previous_day),
-        "truck_data_summary": get_truck_data_summary(cursor, previous_day),
-        "transaction_count_per_truck": get_transaction_count_per_truck(cursor, previous_day),
-        "average_transaction_value_per_truck": get_average_transaction_value_per_truck(cursor, previous_day),
-        "average_total_transaction_value": get_average_total_transaction_value(cursor, previous_day)
-    }
+    """Gather all report data from one grouped query over the daily truck summary."""
+    return build_report_data(get_truck_totals(cursor, previous_day))
 
 
 def generate_report_json(data: dict, prev_day: str) -> dict:
@@ -108,74 +136,124 @@ def generate_report_json(data: dict, prev_day: str) -> dict:
     }
 
 
-def generate_html_report(data: dict, previous_day: str) -> str:
+@lru_cache(maxsize=None)
+def get_template(name: str):
+    """Load and compile a report template once per process, so warm Lambda invocations reuse it."""
+    # Imported on first render rather than at cold start.
+    from jinja2 import Environment, FileSystemLoader  # pylint: disable=import-outside-toplevel
+    # Reports only contain numbers and dates formatted here, and escaping every
+    # cell made rendering several times slower, so autoescape stays off.
+    environment = Environment(loader=FileSystemLoader(TEMPLATE_DIR), autoescape=False,
+                              trim_blocks=True, lstrip_blocks=True)
+    environment.filters["money"] = "{:.2f}".format
+    return environment.get_template(name)
+
+
+def iter_html_report(data: dict, previous_day: str, title: str = "Daily") -> Iterator[str]:
+    """Render the html report of key metrics chunk by chunk."""
+    stream = get_template("report.html").stream(data=data, report_date=previous_day, title=title)
+    stream.enable_buffering(size=256)
+    return stream
+
+
+def generate_html_report(data: dict, previous_day: str, title: str = "Daily") -> str:
     """Generate a html file containing a simple report of key metrics. """
-    html_content = f"""
-    <html>
-    <head>
-        <title>Daily Truck Transactions Report for {previous_day}</title>
-    </head>
-    <body>
-        <h2>Daily Truck Transactions Report for {previous_day}</h2>
-        <p><strong>Total Transaction Value across all trucks:</strong> £{data["total_transaction_value_all_trucks"]}</p>
-        <p><strong>Average Total Transaction Value:</strong> £{data["average_total_transaction_value"]:.2f}</p>
-
-        <h3>Truck Data Summary</h3>
-        <table>
-            <tr><th>Truck ID</th><th>Total Revenue (£)</th><th>Average Transaction Value (£)</th><th>Transaction Count</th></tr>
-            {"".join(f"<tr><td>{truck_id}</td><td>{total_revenue}</td><td>{average_transaction_value:.2f}</td><td>{transaction_count}</td></tr>" for truck_id, total_revenue, average_transaction_value, transaction_count in data["truck_data_summary"])}
-        </table>
-
-        <h3>Transaction Count per Truck</h3>
-        <table>
-            <tr><th>Truck ID</th><th>Transaction Count</th></tr>
-            {"".join(f"<tr><td>{truck_id}</td><td>{transaction_count}</td></tr>" for truck_id, transaction_count in data["transaction_count_per_truck"])}
-        </table>
-
-        <h3>Average Transaction Value per Truck</h3>
-        <table>
-            <tr><th>Truck ID</th><th>Average Transaction Value (£)</th></tr>
-            {"".join(f"<tr><td>{truck_id}</td><td>{average_transaction_value:.2f}</td></tr>" for truck_id,
-                     average_transaction_value in data["average_transaction_value_per_truck"])}
-        </table>
-    </body>
-    </html>
-    """
-    return html_content
+    return "".join(iter_html_report(data, previous_day, title))
 
 
-def save_to_file(data: dict, folder_name: str, filename: str) -> None:
-    """Save the report data to a JSON file in the specified folder."""
+def save_to_file(data: dict | str | Iterable[str], folder_name: str, filename: str) -> None:
+    """Save report data to a file in the specified folder.
+
+    Dicts are written as JSON; strings and iterables of chunks (such as
+    iter_html_report) are written as they are produced.
+    """
     os.makedirs(folder_name, exist_ok=True)
     filepath = os.path.join(folder_name, filename)
-    with open(filepath, "w") as f:
+    with open(filepath, "w", encoding="utf-8") as f:
         if isinstance(data, dict):
             json.dump(data, f, indent=4)
-        else:
+        elif isinstance(data, str):
             f.write(data)
+        else:
+            f.writelines(data)
     print(f"Report saved to {filepath}")
 
 
-def generate_report() -> None:
-    """Main function to connect to the database, retrieve data, and generate the report."""
-    prev_day = get_previous_day()
-    conn = get_redshift_connection()
-    cursor = conn.cursor()
+def render_report_files(report_date: str, truck_totals: list[tuple[int, int, int]],
+                        folder_name: str, period: str = "day") -> None:
+    """Build one day's, week's or month's report and save it as JSON and HTML."""
+    name = f"report_data_{report_date}" if period == "day" else f"report_data_{period}_{report_date}"
+    report_data = build_report_data(truck_totals)
+
+    json_data = generate_report_json(report_data, report_date)
+    if period != "day":
+        json_data["period"] = period
+    save_to_file(json_data, folder_name=folder_name, filename=f"{name}.json")
 
-    set_schema(cursor)
-    report_data = gather_report_data(cursor, prev_day)
+    html_chunks = iter_html_report(report_data, report_date, REPORT_TITLES[period])
+    save_to_file(html_chunks, folder_name=folder_name, filename=f"{name}.html")
 
-    json_data = generate_report_json(report_data, prev_day)
-    save_to_file(json_data, folder_name="report_data",
-                 filename=f"report_data_{prev_day}.json")
 
-    html_content = generate_html_report(report_data, prev_day)
-    save_to_file(html_content, folder_name="report_data",
-                 filename=f"report_data_{prev_day}.html")
+def generate_reports(first_day: str, last_day: str, periods: tuple[str, ...] = (),
+                     folder_name: str = REPORT_FOLDER, workers: int | None = None) -> None:
+    """Generate the report for every day in a range, plus weekly or monthly summaries.
+
+    Every day's totals come from one grouped query and the summaries are added
+    up from the same rows, so they only cover days inside the range. Reports
+    are rendered across a process pool when workers > 1; days without
+    transactions are skipped.
+    """
+    with get_pool().connection() as conn, conn.cursor() as cursor:
+        set_schema(cursor)
+        totals_by_day = get_truck_totals_by_day(cursor, first_day, last_day)
+
+    if not totals_by_day:
+        logging.warning("No transactions between %s and %s.", first_day, last_day)
+        return
+
+    jobs = [(day, truck_totals, "day") for day, truck_totals in totals_by_day.items()]
+    for period in periods:
+        jobs.extend((start, truck_totals, period)
+                    for start, truck_totals in summarise_periods(totals_by_day, period).items())
+    report_dates, truck_totals, job_periods = zip(*jobs)
+    folder_names = [folder_name] * len(jobs)
+
+    workers = min(workers or REPORT_WORKERS, len(jobs))
+    if workers > 1:
+        # Imported here so the report Lambda does not pay for it at cold start.
+        from concurrent.futures import ProcessPoolExecutor  # pylint: disable=import-outside-toplevel
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(render_report_files, report_dates,
+                 truck_totals, folder_names, job_periods))
+    else:
+        list(map(render_report_files, report_dates, truck_totals, folder_names, job_periods))
 
-    cursor.close()
-    conn.close()
+
+def generate_report() -> None:
+    """Main function to connect to the database, retrieve data, and generate the report."""
+    prev_day = get_previous_day()
+    generate_reports(prev_day, prev_day)
 
 
 if __name__ == "__main__":
-    generate_report()
+    import argparse
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(
+        description="Generate truck transaction reports for a range of days.")
+    parser.add_argument("--start", type=date.fromisoformat,
+                        help="First day as YYYY-MM-DD (default: the previous day)")
+    parser.add_argument("--end", type=date.fromisoformat,
+                        help="Last day as YYYY-MM-DD (default: --start)")
+    parser.add_argument("--summary", action="append", default=[], choices=["week", "month"],
+                        help="Also write weekly or monthly summaries; repeatable")
+    parser.add_argument("--workers", type=int, help="Rendering processes (default: REPORT_WORKERS)")
+    parser.add_argument("--output", default=REPORT_FOLDER, help="Folder to write reports to")
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(levelname)s:%(message)s', level=logging.INFO)
+    load_dotenv()
+
+    start_day = str(args.start or get_previous_day())
+    generate_reports(start_day, str(args.end or start_day), tuple(args.summary),
+                     args.output, args.workers)
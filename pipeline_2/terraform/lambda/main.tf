@@ -45,6 +45,7 @@ resource "aws_lambda_function" "html_report_lambda" {
       PORT            = var.DB_PORT
       ACCESS_KEY_ID   = var.ACCESS_KEY_ID
       SECRET_ACCESS_KEY = var.SECRET_ACCESS_KEY
+      REPORT_CACHE_BUCKET = var.BUCKET
     }
   }
 }
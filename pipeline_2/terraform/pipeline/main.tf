@@ -27,6 +27,10 @@ resource "aws_ecs_task_definition" "c14_ellie_etl_task_definition" {
         {
           name  = "BUCKET"
           value = var.S3_BUCKET
+        },
+        {
+          name  = "REPORT_CACHE_BUCKET"
+          value = var.S3_BUCKET
         }
       ]
       logConfiguration = {
@@ -1,13 +1,21 @@
 # pylint: disable=broad-exception-caught
 """Transform script to clean and process the downloaded data ready for upload."""
+import io
 import os
 import logging
+from collections.abc import Iterable
+import numpy as np
 import pandas as pd
+from t3_shared.transaction_schema import cast_transactions
 
 logging.basicConfig(format='%(levelname)s:%(message)s', level=logging.INFO)
 
 CARD_PAYMENT_ID = 1
 CASH_PAYMENT_ID = 2
+PAYMENT_METHOD_IDS = {'card': CARD_PAYMENT_ID, 'cash': CASH_PAYMENT_ID}
+PENCE_PER_POUND = 100
+RAW_COLUMNS = ('timestamp', 'type', 'total')
+MAX_TOTAL = 100
 
 
 def extract_truck_id(file_path: str) -> int:
@@ -23,11 +31,16 @@ def extract_truck_id(file_path: str) -> int:
         f"Error extracting truck ID from {filename}")
 
 
+def is_truck_file(file_name: str) -> bool:
+    """Check whether a file name follows the T3_T[truck_id]_*.csv convention."""
+    return file_name.endswith(".csv") and file_name.startswith("T3_T")
+
+
 def load_data_from_directory(directory: str) -> pd.DataFrame:
     """ Load data from all CSV files in a specified directory into a single DataFrame."""
     dataframes = []
     for file in os.listdir(directory):
-        if file.endswith(".csv") and file.startswith("T3_T"):
+        if is_truck_file(file):
             file_path = os.path.join(directory, file)
             try:
                 df = pd.read_csv(file_path)
@@ -40,30 +53,76 @@ def load_data_from_directory(directory: str) -> pd.DataFrame:
     return pd.concat(dataframes, ignore_index=True) if dataframes else pd.DataFrame()
 
 
-def clean_data(df: pd.DataFrame) -> pd.DataFrame:
-    """Clean the data by handling unexpected, invalid, extreme and missing values."""
+def load_data_from_buffers(files: Iterable[tuple[str, bytes]]) -> tuple[pd.DataFrame, set[str]]:
+    """Load data from in-memory (key, contents) CSV files into a single DataFrame.
+
+    Also returns the keys of the files that were loaded, so files that were
+    skipped or failed to parse keep the rows loaded from their earlier versions.
+    """
+    dataframes = []
+    loaded_keys = set()
+    for file_key, contents in files:
+        if is_truck_file(os.path.basename(file_key)):
+            try:
+                df = pd.read_csv(io.BytesIO(contents))
+                df['truck_id'] = extract_truck_id(file_key)
+                df['source_key'] = file_key
+                dataframes.append(df)
+                loaded_keys.add(file_key)
+                logging.info("Loaded data from %s", file_key)
+            except Exception as e:
+                logging.error("Error loading %s: %s", file_key, str(e))
 
-    df['total'] = pd.to_numeric(df['total'], errors='coerce')
-    df = df.dropna(subset=['total'])
+    raw_data = pd.concat(dataframes, ignore_index=True) if dataframes else pd.DataFrame()
+    return raw_data, loaded_keys
 
-    df = df[(df['total'] > 0) & (df['total'] <= 100)]
 
-    df['total'] = df['total'].round(2).astype(
-        float).apply(lambda x: f"{x:.2f}")
+def map_payment_method_ids(payment_types: pd.Series) -> np.ndarray:
+    """Map payment type labels to ids once per distinct label rather than once per row.
+
+    Unknown and missing labels map to 0.
+    """
+    labels = payment_types.astype('category')
+    lookup = np.array(
+        [PAYMENT_METHOD_IDS.get(str(label).lower(), 0) for label in labels.cat.categories] + [0],
+        dtype=np.int8)
+    return lookup[labels.cat.codes.to_numpy()]
+
+
+def build_clean_frame(df: pd.DataFrame, valid: np.ndarray, timestamp: np.ndarray,
+                      payment_method_id: np.ndarray, total: np.ndarray) -> pd.DataFrame:
+    """Build the cleaned frame in one pass from the valid rows of each column."""
+    cleaned = {column: df[column].to_numpy()[valid]
+               for column in df.columns if column not in RAW_COLUMNS}
+    cleaned['payment_method_id'] = payment_method_id[valid]
+    cleaned['total'] = np.rint(total[valid] * PENCE_PER_POUND).astype(np.int32)
+    cleaned['timestamp'] = timestamp[valid]
+    return pd.DataFrame(cleaned)
+
+
+def clean_data(df: pd.DataFrame) -> pd.DataFrame:
+    """Clean the data by handling unexpected, invalid, extreme and missing values.
+
+    Totals are converted from pounds to integer pence and payment types to ids;
+    rows failing any rule are dropped with a single boolean mask.
+    """
+    total = pd.to_numeric(df['total'], errors='coerce').to_numpy(dtype=np.float64)
+    timestamp = pd.to_datetime(df['timestamp'], errors='coerce').to_numpy()
+    payment_method_id = map_payment_method_ids(df['type'])
 
-    df['type'] = df['type'].str.lower().replace(
-        {'card': CARD_PAYMENT_ID, 'cash': CASH_PAYMENT_ID})
-    df = df.rename(columns={'type': 'payment_method_id'})
-    df['payment_method_id'] = df['payment_method_id'].astype(int)
+    with np.errstate(invalid='ignore'):
+        valid = ((total > 0) & (total <= MAX_TOTAL) &
+                 (payment_method_id > 0) & ~np.isnat(timestamp))
 
+    df = cast_transactions(build_clean_frame(df, valid, timestamp, payment_method_id, total))
     logging.info("Data cleaning complete.")
     return df
 
 
 def save_clean_data(df: pd.DataFrame, output_file: str) -> None:
-    """Save the cleaned DataFrame to a CSV file."""
+    """Save the cleaned DataFrame to a compressed Parquet file."""
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
-    df.to_csv(output_file, index=False)
+    df.to_parquet(output_file, index=False, engine="pyarrow", compression="zstd")
     logging.info("Cleaned data saved to %s", output_file)
 
 
@@ -71,6 +130,6 @@ if __name__ == "__main__":
     raw_data = load_data_from_directory("data")
     if not raw_data.empty:
         cleaned_data = clean_data(raw_data)
-        save_clean_data(cleaned_data, "data/cleaned_data.csv")
+        save_clean_data(cleaned_data, "data/cleaned_data.parquet")
     else:
         logging.warning("No data loaded; cleaned data file not created.")
@@ -0,0 +1 @@
+"""Modules shared by the historical ETL (pipeline/), the hourly ETL and report Lambda (pipeline_2/) and the dashboard."""
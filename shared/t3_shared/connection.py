@@ -0,0 +1,168 @@
+# pylint: disable=broad-exception-caught
+"""Redshift connections and a bounded pool that reuses them across loads, invocations and reruns.
+
+Opening a connection costs a TLS handshake and authentication round trips, so
+the ETL, report Lambda and dashboard borrow connections from a ConnectionPool
+instead.
+"""
+import os
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "4"))
+POOL_MAX_IDLE_SECONDS = float(os.getenv("DB_POOL_MAX_IDLE_SECONDS", "300"))
+# "postgres" points every connection at a local Postgres stand-in for benchmarks.
+DB_DRIVER = os.getenv("DB_DRIVER", "redshift")
+
+
+def get_redshift_connection():
+    """Establish and return a connection to the Redshift database (or its Postgres stand-in)."""
+    # pylint: disable=import-outside-toplevel
+    try:
+        if DB_DRIVER == "postgres":
+            import psycopg2
+            conn = psycopg2.connect(
+                host=os.environ["HOST"],
+                port=int(os.environ.get("PORT", 5432)),
+                user=os.environ["USERNAME"],
+                password=os.environ["PASSWORD"],
+                dbname=os.environ["DATABASE_NAME"]
+            )
+        else:
+            import redshift_connector
+            conn = redshift_connector.connect(
+                host=os.environ["HOST"],
+                port=int(os.environ.get("PORT", 5439)),
+                user=os.environ["USERNAME"],
+                password=os.environ["PASSWORD"],
+                database=os.environ["DATABASE_NAME"]
+            )
+        conn.autocommit = True
+        logging.info("Connected to Redshift.")
+        return conn
+    except Exception as e:
+        logging.error("Error connecting to Redshift: %s", str(e))
+        raise
+
+
+def is_healthy(conn) -> bool:
+    """Check a connection still answers a trivial query."""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1;")
+            cursor.fetchone()
+        return True
+    except Exception:
+        return False
+
+
+def close_quietly(conn) -> None:
+    """Close a connection, ignoring errors from one that is already broken."""
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+class ConnectionPool:
+    """A thread-safe pool holding at most max_size open connections.
+
+    Borrowed connections are health-checked first; ones idle for longer than
+    max_idle_seconds or failing the check are closed and replaced. Callers
+    beyond max_size wait for a connection to be returned.
+    """
+
+    def __init__(self, connect=get_redshift_connection, max_size: int = POOL_MAX_SIZE,
+                 max_idle_seconds: float = POOL_MAX_IDLE_SECONDS):
+        self.connect = connect
+        self.max_idle_seconds = max_idle_seconds
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._idle = deque()
+        self._stats = {"connects": 0, "reuses": 0, "discards": 0, "connect_seconds": 0.0}
+
+    def _open(self):
+        start = time.perf_counter()
+        conn = self.connect()
+        with self._lock:
+            self._stats["connects"] += 1
+            self._stats["connect_seconds"] += time.perf_counter() - start
+        return conn
+
+    def _discard(self, conn) -> None:
+        close_quietly(conn)
+        with self._lock:
+            self._stats["discards"] += 1
+
+    def _take_idle(self):
+        """Pop the most recently returned connection that is still fresh and healthy."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                conn, returned_at = self._idle.pop()
+            if time.monotonic() - returned_at <= self.max_idle_seconds and is_healthy(conn):
+                with self._lock:
+                    self._stats["reuses"] += 1
+                return conn
+            self._discard(conn)
+
+    def acquire(self):
+        """Borrow a connection in autocommit mode, opening one if none can be reused."""
+        self._slots.acquire()
+        try:
+            return self._take_idle() or self._open()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn) -> None:
+        """Return a borrowed connection, discarding it if it cannot be reset."""
+        try:
+            if not conn.autocommit:
+                conn.rollback()
+                conn.autocommit = True
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+        except Exception as e:
+            logging.warning("Discarding broken connection: %s", str(e))
+            self._discard(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with block."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self) -> None:
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for conn, _ in idle:
+            close_quietly(conn)
+
+    def stats(self) -> dict:
+        """Return connection counts and the total time spent opening connections."""
+        with self._lock:
+            return {**self._stats, "idle": len(self._idle)}
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide pool, creating it on first use."""
+    global _default_pool  # pylint: disable=global-statement
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ConnectionPool()
+        return _default_pool
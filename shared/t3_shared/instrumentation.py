@@ -0,0 +1,112 @@
+# pylint: disable=broad-exception-caught
+"""Per-stage timing, counters and opt-in profiling for the ETL pipelines.
+
+Each stage runs inside RunSummary.stage(), which records its wall time and
+peak RSS alongside any counters the stage sets (rows in and out, rows rejected
+by cleaning, bytes downloaded). RunSummary.emit() logs the run as one JSON
+document and, when PIPELINE_SUMMARY_FILE is set, writes it there too. Setting
+PIPELINE_PROFILE_DIR also dumps a cProfile .prof file and a tracemalloc
+snapshot for every stage.
+"""
+import os
+import sys
+import json
+import time
+import cProfile
+import logging
+import resource
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+PROFILE_DIR = os.getenv("PIPELINE_PROFILE_DIR")
+SUMMARY_FILE = os.getenv("PIPELINE_SUMMARY_FILE")
+
+
+def reset_peak_rss() -> bool:
+    """Reset the kernel's high-water mark of resident memory, where Linux allows it."""
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def get_peak_rss_mb() -> float:
+    """Peak resident memory since the last reset, falling back to the process lifetime peak."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+class RunSummary:
+    """Collects a record per pipeline stage and emits them as a JSON run summary."""
+
+    def __init__(self, pipeline: str):
+        self.pipeline = pipeline
+        self.started_at = datetime.now(timezone.utc)
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name: str, **labels):
+        """Time a stage and yield its record, so the stage can add counters to it."""
+        record = {"stage": name, **labels}
+        profile_name = "_".join([name, *map(str, labels.values())])
+        profiler = cProfile.Profile() if PROFILE_DIR else None
+        if profiler:
+            tracemalloc.start()
+            profiler.enable()
+        reset_peak_rss()
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record["error"] = str(e)
+            raise
+        finally:
+            record["seconds"] = round(time.perf_counter() - start, 3)
+            record["peak_rss_mb"] = round(get_peak_rss_mb(), 1)
+            if profiler:
+                profiler.disable()
+                self.dump_profiles(profile_name, profiler)
+            self.stages.append(record)
+
+    def dump_profiles(self, profile_name: str, profiler: cProfile.Profile) -> None:
+        """Write a stage's cProfile stats and tracemalloc snapshot to PROFILE_DIR."""
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            prefix = os.path.join(
+                PROFILE_DIR, f"{self.started_at:%Y%m%dT%H%M%S}_{self.pipeline}_{profile_name}")
+            profiler.dump_stats(f"{prefix}.prof")
+            tracemalloc.take_snapshot().dump(f"{prefix}.tracemalloc")
+        except Exception as e:
+            logging.error("Error writing profiles for %s: %s", profile_name, str(e))
+        finally:
+            tracemalloc.stop()
+
+    def to_dict(self) -> dict:
+        """The run summary: one record per stage plus run-wide totals."""
+        return {
+            "pipeline": self.pipeline,
+            "started_at": self.started_at.isoformat(),
+            "seconds": round(sum(stage["seconds"] for stage in self.stages), 3),
+            "peak_rss_mb": max((stage["peak_rss_mb"] for stage in self.stages), default=0),
+            "stages": self.stages
+        }
+
+    def emit(self) -> dict:
+        """Log the run summary as JSON and write it to SUMMARY_FILE if set."""
+        summary = self.to_dict()
+        logging.info("Run summary: %s", json.dumps(summary))
+        if SUMMARY_FILE:
+            with open(SUMMARY_FILE, "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=4)
+        return summary
@@ -0,0 +1,108 @@
+# pylint: disable=broad-exception-caught
+"""Rendered daily reports stored by date in S3 or a local directory.
+
+A day's report only changes when late transactions for it are loaded, so the
+report Lambda renders each date once and serves the stored JSON and HTML
+afterwards. The ETLs and the backfill invalidate every date a load touches.
+"""
+from __future__ import annotations
+import os
+import logging
+from datetime import date, timedelta
+
+REPORT_CACHE_BUCKET = os.getenv("REPORT_CACHE_BUCKET")
+REPORT_CACHE_PREFIX = os.getenv("REPORT_CACHE_PREFIX", "reports/")
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR", "report_data")
+ARTIFACT_EXTENSIONS = ("json", "html")
+CONTENT_TYPES = {"json": "application/json", "html": "text/html"}
+
+_s3_client = None
+
+
+def get_s3_client():
+    """Create the S3 client on first use, so local-disk caching never imports boto3."""
+    global _s3_client  # pylint: disable=global-statement
+    if _s3_client is None:
+        import boto3  # pylint: disable=import-outside-toplevel
+        _s3_client = boto3.client(
+            "s3",
+            aws_access_key_id=os.getenv("ACCESS_KEY_ID"),
+            aws_secret_access_key=os.getenv("SECRET_ACCESS_KEY")
+        )
+    return _s3_client
+
+
+def get_artifact_name(day: str, extension: str) -> str:
+    """Name a report artifact the way generate_report saves it."""
+    return f"report_data_{day}.{extension}"
+
+
+def read_artifact(day: str, extension: str) -> str | None:
+    """Return a stored report artifact, or None if it has not been rendered yet."""
+    name = get_artifact_name(day, extension)
+    try:
+        if REPORT_CACHE_BUCKET:
+            s3 = get_s3_client()
+            response = s3.get_object(Bucket=REPORT_CACHE_BUCKET, Key=REPORT_CACHE_PREFIX + name)
+            return response["Body"].read().decode("utf-8")
+        with open(os.path.join(REPORT_CACHE_DIR, name), encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        if getattr(e, "response", {}).get("Error", {}).get("Code") not in ("NoSuchKey", "404"):
+            logging.error("Error reading cached report %s: %s", name, str(e))
+        return None
+
+
+def write_artifacts(day: str, artifacts: dict[str, str]) -> None:
+    """Store a day's rendered artifacts, keyed by extension. Failures only cost a re-render."""
+    for extension, content in artifacts.items():
+        name = get_artifact_name(day, extension)
+        try:
+            if REPORT_CACHE_BUCKET:
+                get_s3_client().put_object(
+                    Bucket=REPORT_CACHE_BUCKET, Key=REPORT_CACHE_PREFIX + name,
+                    Body=content.encode("utf-8"), ContentType=CONTENT_TYPES[extension])
+            else:
+                os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+                path = os.path.join(REPORT_CACHE_DIR, name)
+                with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                    f.write(content)
+                os.replace(f"{path}.tmp", path)
+        except Exception as e:
+            logging.error("Error caching report %s: %s", name, str(e))
+
+
+def get_days(day_ranges: list[tuple[date, date] | None]) -> list[str]:
+    """List every distinct day spanned by day_ranges as an ISO date string."""
+    days = set()
+    for day_range in filter(None, day_ranges):
+        first_day, last_day = day_range
+        days.update(first_day + timedelta(days=offset)
+                    for offset in range((last_day - first_day).days + 1))
+    return [day.isoformat() for day in sorted(days)]
+
+
+def invalidate_reports(day_ranges: list[tuple[date, date] | None]) -> None:
+    """Drop the stored reports for every day spanned by day_ranges.
+
+    Call this after loading transactions, so the next request re-renders them.
+    """
+    names = [get_artifact_name(day, extension)
+             for day in get_days(day_ranges) for extension in ARTIFACT_EXTENSIONS]
+    try:
+        if REPORT_CACHE_BUCKET:
+            for start in range(0, len(names), 1000):
+                get_s3_client().delete_objects(Bucket=REPORT_CACHE_BUCKET, Delete={
+                    "Objects": [{"Key": REPORT_CACHE_PREFIX + name} for name in names[start:start + 1000]],
+                    "Quiet": True})
+        else:
+            for name in names:
+                path = os.path.join(REPORT_CACHE_DIR, name)
+                if os.path.exists(path):
+                    os.remove(path)
+        if names:
+            logging.info("Invalidated cached reports for %d days.", len(names) // len(ARTIFACT_EXTENSIONS))
+    except Exception as e:
+        logging.error("Error invalidating cached reports: %s", str(e))
@@ -0,0 +1,45 @@
+"""Pre-aggregated daily and hourly truck summaries maintained alongside FACT_Transaction.
+
+Both tables hold a transaction count and revenue (in pence) per truck and
+payment method, so reports and dashboards read days x trucks rows instead of
+every transaction.
+"""
+from datetime import date, timedelta
+
+
+def refresh_rollups(cursor, day_ranges: list[tuple[date, date] | None]) -> None:
+    """Recompute the hourly and daily summaries for every day spanned by day_ranges.
+
+    Run this in the same transaction as the FACT_Transaction changes it covers.
+    """
+    day_ranges = [day_range for day_range in day_ranges if day_range]
+    if not day_ranges:
+        return
+
+    first_day = min(first for first, _ in day_ranges)
+    last_day = max(last for _, last in day_ranges)
+
+    cursor.execute("""
+        DELETE FROM AGG_Hourly_Truck_Summary WHERE day BETWEEN %s AND %s
+    """, (first_day, last_day))
+    cursor.execute("""
+        INSERT INTO AGG_Hourly_Truck_Summary
+            (day, hour, truck_id, payment_method_id, transaction_count, total_revenue)
+        SELECT CAST(at AS DATE), EXTRACT(HOUR FROM at), truck_id, payment_method_id,
+               COUNT(*), SUM(total)
+        FROM FACT_Transaction
+        WHERE at >= %s AND at < %s
+        GROUP BY 1, 2, 3, 4
+    """, (first_day, last_day + timedelta(days=1)))
+
+    cursor.execute("""
+        DELETE FROM AGG_Daily_Truck_Summary WHERE day BETWEEN %s AND %s
+    """, (first_day, last_day))
+    cursor.execute("""
+        INSERT INTO AGG_Daily_Truck_Summary
+            (day, truck_id, payment_method_id, transaction_count, total_revenue)
+        SELECT day, truck_id, payment_method_id, SUM(transaction_count), SUM(total_revenue)
+        FROM AGG_Hourly_Truck_Summary
+        WHERE day BETWEEN %s AND %s
+        GROUP BY 1, 2, 3
+    """, (first_day, last_day))
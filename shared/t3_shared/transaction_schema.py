@@ -0,0 +1,20 @@
+"""Compact in-memory dtypes for transaction frames, shared by the pipelines and dashboard.
+
+The dtypes mirror FACT_Transaction in pipeline/schema.sql: SMALLINT ids fit in
+int16/int8 and INT totals (in pence) in int32.
+"""
+import pandas as pd
+
+TRANSACTION_DTYPES = {
+    "truck_id": "int16",
+    "payment_method_id": "int8",
+    "total": "int32",
+    "timestamp": "datetime64[ns]",
+    "source_key": "category"
+}
+
+
+def cast_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast whichever transaction columns are present in df to their compact dtypes."""
+    return df.astype({column: dtype for column, dtype in TRANSACTION_DTYPES.items()
+                      if column in df.columns})